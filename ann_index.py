@@ -0,0 +1,142 @@
+import os
+import zlib
+
+import numpy as np
+
+# Below this many encodings an exact scan is fast enough and always correct
+ann_min_gallery_size = 20000
+# Inverted lists probed per query: higher means better recall, slower queries
+ann_nprobe = 8
+kmeans_iterations = 10
+kmeans_sample_per_list = 64
+index_format_version = 1
+
+
+def index_file_for(model_file):
+    return os.path.splitext(model_file)[0] + '.ivf.npz'
+
+
+def gallery_fingerprint(encodings):
+    encodings = np.ascontiguousarray(encodings, dtype=np.float32)
+    return np.array([len(encodings), zlib.crc32(encodings.tobytes())], dtype=np.int64)
+
+
+def _squared_distances(data, centroids):
+    data_norms = np.einsum('ij,ij->i', data, data)
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    return data_norms[:, None] + centroid_norms[None, :] - 2.0 * (data @ centroids.T)
+
+
+def _assign(data, centroids, chunk_size=16384):
+    assignment = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
+        assignment[start:start + chunk_size] = np.argmin(_squared_distances(chunk, centroids), axis=1)
+    return assignment
+
+
+def _kmeans(data, nlist, iterations, rng):
+    centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _assign(data, centroids)
+        counts = np.bincount(assignment, minlength=nlist)
+        order = np.argsort(assignment, kind='stable')
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts[filled])[:-1]))
+        sums = np.add.reduceat(data[order], starts, axis=0)
+        centroids[filled] = sums / counts[filled, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index: k-means coarse cells, exact distances inside probed cells."""
+
+    def __init__(self, centroids, order, offsets, fingerprint):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.fingerprint = np.asarray(fingerprint, dtype=np.int64)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, encodings, nlist=None, seed=0):
+        data = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, 128)
+        if nlist is None:
+            nlist = int(round(np.sqrt(len(data))))
+        nlist = max(1, min(nlist, len(data)))
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(data), nlist * kmeans_sample_per_list)
+        sample = data[rng.choice(len(data), sample_size, replace=False)]
+        centroids = _kmeans(sample, nlist, kmeans_iterations, rng)
+        assignment = _assign(data, centroids)
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=nlist))))
+        return cls(centroids, order, offsets, gallery_fingerprint(data))
+
+    def search(self, encodings, squared_norms, queries, nprobe=None):
+        """Return (row index, distance) arrays of the approximate nearest gallery row."""
+        nprobe = min(nprobe or ann_nprobe, self.nlist)
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        query_norms = np.einsum('ij,ij->i', queries, queries)
+        cell_distances = _squared_distances(queries, self.centroids)
+        if nprobe < self.nlist:
+            probes = np.argpartition(cell_distances, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), (len(queries), self.nlist))
+
+        best_rows = np.empty(len(queries), dtype=np.int64)
+        best_distances = np.empty(len(queries), dtype=np.float32)
+        for i, query in enumerate(queries):
+            rows = np.concatenate([self.order[self.offsets[cell]:self.offsets[cell + 1]] for cell in probes[i]])
+            if not len(rows):
+                rows = np.arange(len(encodings))
+            squared = query_norms[i] + squared_norms[rows] - 2.0 * (encodings[rows] @ query)
+            best = np.argmin(squared)
+            best_rows[i] = rows[best]
+            best_distances[i] = np.sqrt(max(float(squared[best]), 0.0))
+        return best_rows, best_distances
+
+    def save(self, path):
+        temp_file = path + '.tmp'
+        with open(temp_file, 'wb') as file:
+            np.savez(file, format_version=np.int64(index_format_version), centroids=self.centroids,
+                     order=self.order, offsets=self.offsets, fingerprint=self.fingerprint)
+        os.replace(temp_file, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['format_version']) != index_format_version:
+                raise ValueError(f"unsupported index format {int(data['format_version'])}")
+            return cls(data['centroids'], data['order'], data['offsets'], data['fingerprint'])
+
+
+def build_index_file(encodings, path):
+    if len(encodings) < ann_min_gallery_size:
+        if os.path.isfile(path):
+            os.remove(path)
+        return None
+    index = IVFIndex.build(encodings)
+    index.save(path)
+    print(f"ANN index built: {index.nlist} lists over {len(encodings)} encodings")
+    return index
+
+
+def load_index_file(path, encodings):
+    if len(encodings) < ann_min_gallery_size or not os.path.isfile(path):
+        return None
+    try:
+        index = IVFIndex.load(path)
+    except Exception as err:
+        print(f"Error in load_index_file: {err}")
+        return None
+    if not np.array_equal(index.fingerprint, gallery_fingerprint(encodings)):
+        print("ANN index does not match the trained model, using exact search.")
+        return None
+    return index
@@ -0,0 +1,114 @@
+import time
+
+from database import sqlite_now
+
+# A presence starts at the first sighting of an identity on a camera and
+# ends presence_timeout seconds after its last sighting. Within a presence
+# at most one event is emitted: a check-in on entry cameras, a check-out on
+# exit cameras.
+presence_timeout = 10.0
+# The event is emitted once the identity has been seen min_sightings times
+# over at least min_dwell seconds; single-frame false matches emit nothing
+min_dwell = 0.5
+min_sightings = 2
+# Unknown faces without a track to tell them apart share one presence per camera
+unknown_key = 'unknown'
+
+
+def snapshot_quality(box, distance, known):
+    """Larger faces are better; for known faces, closer matches too."""
+    top, right, bottom, left = box
+    area = max(0, right - left) * max(0, bottom - top)
+    return area * (1.0 - min(distance, 1.0)) if known else area
+
+
+class AttendanceEvent:
+    def __init__(self, kind, camera_type, name, timestamp, snapshot, box, distance):
+        self.kind = kind  # 'check_in', 'check_out' or 'unknown_exit'
+        self.camera_type = camera_type
+        self.name = name
+        self.timestamp = timestamp
+        self.snapshot = snapshot
+        self.box = box
+        self.distance = distance
+
+
+class Presence:
+    def __init__(self, name, now):
+        self.name = name
+        self.first_seen = now
+        self.first_seen_at = sqlite_now()
+        self.last_seen = now
+        self.sightings = 0
+        self.emitted = False
+        self.quality = -1.0
+        self.snapshot = None
+        self.box = None
+        self.distance = None
+
+
+class AttendanceEvents:
+    """Turns per-frame recognitions of one camera into one event per presence.
+
+    Call observe() with the faces of every detection frame, before anything
+    is drawn on it. The best-quality frame of the presence so far is kept
+    (copied only when it improves) and handed to on_event with the event;
+    the event's timestamp is the time of the first sighting.
+    """
+
+    def __init__(self, camera_type, on_event):
+        self.camera_type = camera_type
+        self.on_event = on_event
+        self.presences = {}
+        self.sightings = 0
+        self.events = 0
+
+    def observe(self, frame, faces, now=None):
+        """faces is a list of (key, name, box, distance); key is the track id or None."""
+        now = time.monotonic() if now is None else now
+        for key, name, box, distance in faces:
+            if name is not None:
+                key = name
+            elif key is None:
+                key = unknown_key
+            else:
+                key = (unknown_key, key)
+            self.sightings += 1
+            presence = self.presences.get(key)
+            if presence is None or now - presence.last_seen > presence_timeout:
+                presence = self.presences[key] = Presence(name, now)
+            presence.last_seen = now
+            presence.sightings += 1
+            if not presence.emitted:
+                quality = snapshot_quality(box, distance, name is not None)
+                if quality > presence.quality:
+                    presence.quality = quality
+                    presence.snapshot = frame.copy()
+                    presence.box = box
+                    presence.distance = distance
+                if presence.sightings >= min_sightings and now - presence.first_seen >= min_dwell:
+                    self._emit(presence)
+        self._expire(now)
+
+    def _emit(self, presence):
+        presence.emitted = True
+        if self.camera_type == 'exit':
+            kind = 'check_out' if presence.name is not None else 'unknown_exit'
+        else:
+            kind = 'check_in'
+        event = AttendanceEvent(kind, self.camera_type, presence.name, presence.first_seen_at,
+                                presence.snapshot, presence.box, presence.distance)
+        # The presence lives on to suppress repeats but no longer needs its frame
+        presence.snapshot = None
+        self.events += 1
+        try:
+            self.on_event(event)
+        except Exception as err:
+            print(f"Error in AttendanceEvents.on_event: {err}")
+
+    def _expire(self, now):
+        for key in [key for key, presence in self.presences.items() if now - presence.last_seen > presence_timeout]:
+            del self.presences[key]
+
+    def stats(self):
+        return {'sightings': self.sightings, 'events': self.events, 'present': len(self.presences)}
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery import GallerySnapshot
+
+modes = ('per_image', 'centroid', 'templates')
+
+
+def load_encodings(args):
+    if args.synthetic:
+        from bench_ann import synthetic_gallery
+        rng = np.random.default_rng(0)
+        encodings, _, person_ids = synthetic_gallery(args.synthetic * args.shots, rng, args.shots)
+        return list(encodings), [str(person_id) for person_id in person_ids]
+    from training import prepare_training_data
+    return prepare_training_data(args.images)
+
+
+def leave_one_out(faces_encodings, labels, mode, tolerance):
+    # Each encoding is queried against a model trained on all the others
+    from training import aggregate_encodings
+
+    correct = wrong = rejected = 0
+    gallery_rows = 0
+    match_seconds = 0.0
+    for i in range(len(labels)):
+        rest_encodings = faces_encodings[:i] + faces_encodings[i + 1:]
+        rest_labels = labels[:i] + labels[i + 1:]
+        model_encodings, model_labels = aggregate_encodings(rest_encodings, rest_labels, mode)
+        snapshot = GallerySnapshot(model_encodings, model_labels, None)
+        gallery_rows += len(snapshot)
+
+        start = time.perf_counter()
+        name, _ = snapshot.match([faces_encodings[i]], tolerance)[0]
+        match_seconds += time.perf_counter() - start
+
+        if name is None:
+            rejected += 1
+        elif name == labels[i]:
+            correct += 1
+        else:
+            wrong += 1
+    total = len(labels)
+    return correct / total, wrong / total, rejected / total, gallery_rows / total, match_seconds / total * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-image vs aggregated model accuracy (leave-one-out)")
+    parser.add_argument('--images', default='images')
+    parser.add_argument('--synthetic', type=int, default=0, help="number of synthetic people instead of --images")
+    parser.add_argument('--shots', type=int, default=20, help="synthetic encodings per person")
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    args = parser.parse_args()
+
+    faces_encodings, labels = load_encodings(args)
+    faces_encodings = [np.asarray(encoding) for encoding in faces_encodings]
+    print(f"{len(labels)} encodings of {len(set(labels))} people")
+    print(f"{'mode':>10} {'correct':>8} {'wrong':>8} {'rejected':>9} {'rows':>8} {'ms/match':>9}")
+    for mode in modes:
+        correct, wrong, rejected, rows, ms = leave_one_out(faces_encodings, labels, mode, args.tolerance)
+        print(f"{mode:>10} {correct:>8.3f} {wrong:>8.3f} {rejected:>9.3f} {rows:>8.0f} {ms:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import IVFIndex
+from gallery import GallerySnapshot
+
+
+def synthetic_gallery(size, rng, shots_per_person=5):
+    # Rough shape of dlib encodings: ~1.0 apart between people, ~0.35 within
+    people = max(1, size // shots_per_person)
+    centers = rng.normal(0.0, 0.065, (people, 128)).astype(np.float32)
+    person_ids = np.arange(size) % people
+    encodings = centers[person_ids] + rng.normal(0.0, 0.02, (size, 128)).astype(np.float32)
+    return encodings, centers, person_ids
+
+
+def time_queries(search, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            result = search(query[None, :])
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1000.0, result
+
+
+def run(size, nprobes, num_queries, repeat, rng):
+    encodings, centers, _ = synthetic_gallery(size, rng)
+    labels = [str(i) for i in range(size)]
+    snapshot = GallerySnapshot(encodings, labels, None)
+    person_ids = rng.integers(0, len(centers), num_queries)
+    queries = centers[person_ids] + rng.normal(0.0, 0.02, (num_queries, 128)).astype(np.float32)
+
+    exact_rows = np.argmin(snapshot.distances(queries), axis=1)
+    exact_ms, _ = time_queries(lambda q: np.argmin(snapshot.distances(q), axis=1), queries, repeat)
+
+    start = time.perf_counter()
+    index = IVFIndex.build(encodings)
+    build_s = time.perf_counter() - start
+
+    print(f"\n{size} encodings: exact {exact_ms:.3f} ms/query, index build {build_s:.2f} s ({index.nlist} lists)")
+    print(f"{'nprobe':>8} {'ms/query':>10} {'speedup':>9} {'recall@1':>9}")
+    for nprobe in nprobes:
+        ann_ms, _ = time_queries(
+            lambda q: index.search(snapshot.encodings, snapshot.squared_norms, q, nprobe), queries, repeat)
+        ann_rows, _ = index.search(snapshot.encodings, snapshot.squared_norms, queries, nprobe)
+        recall = float(np.mean(ann_rows == exact_rows))
+        print(f"{nprobe:>8} {ann_ms:>10.3f} {exact_ms / ann_ms:>8.1f}x {recall:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN index latency and recall against the exact matcher")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        run(size, args.nprobe, args.queries, args.repeat, rng)
+
+
+if __name__ == '__main__':
+    main()
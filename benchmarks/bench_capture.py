@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camera import open_capture
+
+
+def run(path, skip):
+    # skip == 0: cap.read() every frame (decode everything, the old loop)
+    # skip >= 1: grab() every frame, retrieve() every skip-th
+    cap = open_capture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Could not open {path}")
+    frames = decoded = 0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    while True:
+        if skip == 0:
+            ret, _ = cap.read()
+            if not ret:
+                break
+            decoded += 1
+        else:
+            if not cap.grab():
+                break
+            if frames % skip == 0:
+                ret, _ = cap.retrieve()
+                decoded += ret
+        frames += 1
+    cap.release()
+    return frames, decoded, time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU cost of read() vs grab()/retrieve() with frame skipping")
+    parser.add_argument('video', help="local video file (or stream URL) to decode")
+    parser.add_argument('--skips', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    frames, decoded, base_cpu, wall = run(args.video, 0)
+    print(f"{frames} frames")
+    print(f"{'mode':>14} {'decoded':>8} {'cpu s':>7} {'cpu ms/frame':>13} {'vs read()':>10}")
+    print(f"{'read()':>14} {decoded:>8} {base_cpu:>7.2f} {base_cpu / frames * 1000:>13.2f} {1.0:>9.2f}x")
+    for skip in args.skips:
+        frames, decoded, cpu, wall = run(args.video, skip)
+        print(f"{f'grab, 1/{skip}':>14} {decoded:>8} {cpu:>7.2f} {cpu / frames * 1000:>13.2f} {cpu / base_cpu:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_io import read_image
+from recognition import locate_and_encode
+from training import training_image_paths
+
+
+def box_iou(a, b):
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter) if inter else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detection fps and recall at reduced detection scales")
+    parser.add_argument('--images', default='images')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.5, 0.25])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    args = parser.parse_args()
+
+    frames = []
+    for _, img_path in training_image_paths(args.images):
+        # Full-size decode: this measures the detector, not the loader
+        img = read_image(img_path, max_side=0)
+        if img is not None:
+            frames.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    print(f"{len(frames)} images, mean size {np.mean([f.shape[1] for f in frames]):.0f}x"
+          f"{np.mean([f.shape[0] for f in frames]):.0f}")
+
+    # Faces found at full resolution are the reference for recall
+    reference = [locate_and_encode(frame, 1.0) for frame in frames]
+
+    print(f"{'scale':>6} {'full-res enc':>13} {'fps':>7} {'faces':>6} {'recall':>7} {'same id':>8}")
+    for scale in args.scales:
+        for full_resolution in ((True, False) if scale < 1.0 else (True,)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                results = [locate_and_encode(frame, scale, full_resolution) for frame in frames]
+            fps = args.repeat * len(frames) / (time.perf_counter() - start)
+
+            found = matched = same_identity = total = 0
+            for (ref_boxes, ref_encodings), (boxes, encodings) in zip(reference, results):
+                total += len(ref_boxes)
+                found += len(boxes)
+                for ref_box, ref_encoding in zip(ref_boxes, ref_encodings):
+                    overlaps = [box_iou(ref_box, box) for box in boxes]
+                    if overlaps and max(overlaps) >= 0.3:
+                        matched += 1
+                        encoding = encodings[int(np.argmax(overlaps))]
+                        if np.linalg.norm(encoding - ref_encoding) <= args.tolerance:
+                            same_identity += 1
+            recall = matched / total if total else 0.0
+            agreement = same_identity / matched if matched else 0.0
+            print(f"{scale:>6.2f} {str(full_resolution):>13} {fps:>7.2f} {found:>6} {recall:>7.3f} {agreement:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recognition
+from image_io import read_image
+from training import training_image_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face encoding throughput vs. batch size")
+    parser.add_argument('--images', default='images')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--faces', type=int, default=256, help="faces encoded per batch size")
+    args = parser.parse_args()
+
+    # One (frame, single face box) item per image that has a face; batches
+    # mix images the way frames from several cameras would be mixed
+    items = []
+    for _, img_path in training_image_paths(args.images):
+        img = read_image(img_path)
+        if img is None:
+            continue
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        boxes = recognition.detect_faces(rgb, 1.0)
+        if boxes:
+            items.append((rgb, boxes[:1]))
+    if not items:
+        print("No faces found in", args.images)
+        return
+    print(f"{len(items)} face images")
+
+    print(f"{'batch':>6} {'faces/sec':>10} {'speedup':>8}")
+    baseline = None
+    for batch_size in args.batch_sizes:
+        source = itertools.cycle(items)
+        batches = max(1, args.faces // batch_size)
+        start = time.perf_counter()
+        for _ in range(batches):
+            recognition.encode_face_batch([next(source) for _ in range(batch_size)])
+        rate = batches * batch_size / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f"{batch_size:>6} {rate:>10.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import RecordWriter, sqlite_now, writer_queue_size
+
+
+def create_schema(path, users):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, address TEXT, phone TEXT, email TEXT)')
+    conn.execute('CREATE TABLE records (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, check_in_time TEXT, check_out_time TEXT, image BLOB, snapshot TEXT, thumbnail TEXT, FOREIGN KEY(user_id) REFERENCES users(id))')
+    conn.executemany('INSERT INTO users (name) VALUES (?)', [(f"person{i}",) for i in range(users)])
+    conn.commit()
+    conn.close()
+
+
+def camera_events(camera, users, snapshot):
+    # Entry cameras check people in, exit cameras check them out
+    i = 0
+    while True:
+        user = (camera * 7919 + i) % users
+        yield ('check_in', user, snapshot) if camera % 2 == 0 else ('check_out', user, None)
+        i += 1
+
+
+def pacer(rate):
+    # Each camera emits at most `rate` events per second; a camera blocked on
+    # its own writes falls behind instead. No rate: as fast as it can
+    if not rate:
+        return lambda: None
+    interval = 1.0 / rate
+    next_event = [time.perf_counter()]
+
+    def pace():
+        next_event[0] += interval
+        delay = next_event[0] - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return pace
+
+
+def run_connect_per_event(path, cameras, seconds, users, snapshot, rate):
+    """What recognize_faces used to do: connect, write and commit per frame."""
+    counts = [0] * cameras
+    stop = time.perf_counter() + seconds
+
+    def camera(index):
+        pace = pacer(rate)
+        for kind, user, snapshot_path in camera_events(index, users, snapshot):
+            if time.perf_counter() >= stop:
+                return
+            name = f"person{user}"
+            conn = sqlite3.connect(path, timeout=30)
+            if kind == 'check_in':
+                conn.execute("INSERT INTO records (user_id, check_in_time, snapshot) VALUES ((SELECT id FROM users WHERE name=?), ?, ?)",
+                             (name, sqlite_now(), snapshot_path))
+            else:
+                conn.execute("UPDATE records SET check_out_time=? WHERE user_id=(SELECT id FROM users WHERE name=?) AND check_out_time IS NULL",
+                             (sqlite_now(), name))
+            conn.commit()
+            conn.close()
+            counts[index] += 1
+            pace()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=camera, args=(i,)) for i in range(cameras)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts), time.perf_counter() - start
+
+
+def run_writer(path, cameras, seconds, users, snapshot, rate):
+    writer = RecordWriter(path)
+    stop = time.perf_counter() + seconds
+
+    def camera(index):
+        pace = pacer(rate)
+        for kind, user, snapshot_path in camera_events(index, users, snapshot):
+            if time.perf_counter() >= stop:
+                return
+            if not rate and writer.stats()['queued'] >= writer_queue_size:
+                # Unpaced, wait for room instead of spinning on a full queue,
+                # which would only starve the writer thread of the GIL
+                time.sleep(0.001)
+                continue
+            # Cameras resolve labels to user ids in memory, see identities.py
+            if kind == 'check_in':
+                writer.check_in(user + 1, snapshot_path)
+            else:
+                writer.check_out(user + 1)
+            pace()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=camera, args=(i,)) for i in range(cameras)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # The clock stops with the cameras: the final flush waits up to
+    # writer_flush_interval for a batch that would keep filling in the app
+    elapsed = time.perf_counter() - start
+    written_in_time = writer.stats()['written']
+    flush_start = time.perf_counter()
+    writer.flush()
+    flush_ms = (time.perf_counter() - flush_start) * 1000.0
+    stats = writer.stats()
+    # Paced, every accepted event counts (the flush has committed them all);
+    # unpaced, the queue is always full, so only what was committed in time
+    count = stats['written'] if rate else written_in_time
+    return count, elapsed, flush_ms, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attendance record write throughput under multi-camera load")
+    parser.add_argument('--cameras', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--rate', type=float, default=200.0,
+                        help="events per second each camera tries to write in the paced run")
+    parser.add_argument('--users', type=int, default=500)
+    args = parser.parse_args()
+
+    # Records hold the snapshot store path of the face crop, see snapshot_store.py
+    snapshot = 'ab/' + 'ab' * 20 + '.jpg'
+    with tempfile.TemporaryDirectory() as tmp:
+        # Paced shows the load cameras really offer; unpaced shows capacity
+        for rate in (args.rate, None):
+            print(f"{rate:.0f} events/s offered per camera" if rate else "Unpaced (capacity)")
+            print(f"{'cameras':>8} {'per-event rec/s':>16} {'writer rec/s':>13} {'speedup':>8} "
+                  f"{'flush ms':>9} {'batches':>8} {'dropped':>8}")
+            for cameras in args.cameras:
+                old_path = os.path.join(tmp, f"old{cameras}_{rate}.db")
+                new_path = os.path.join(tmp, f"new{cameras}_{rate}.db")
+                create_schema(old_path, args.users)
+                create_schema(new_path, args.users)
+                old_count, old_elapsed = run_connect_per_event(old_path, cameras, args.seconds, args.users, snapshot, rate)
+                new_count, new_elapsed, flush_ms, stats = run_writer(new_path, cameras, args.seconds, args.users, snapshot, rate)
+                old_rate = old_count / old_elapsed
+                new_rate = new_count / new_elapsed
+                print(f"{cameras:>8} {old_rate:>16.1f} {new_rate:>13.1f} {new_rate / old_rate:>7.1f}x "
+                      f"{flush_ms:>9.0f} {stats['batches']:>8} {stats['dropped']:>8}")
+            print()
+
+
+if __name__ == '__main__':
+    main()
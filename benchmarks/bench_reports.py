@@ -0,0 +1,83 @@
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reports
+from database import connect, migrate
+
+
+def populate(path, records, users, per_day, rng):
+    # per_day check-ins a day, ending now; the newest hour stays open
+    conn = connect(path)
+    conn.executemany('INSERT INTO users (name) VALUES (?)', [(f"person{i}",) for i in range(users)])
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    step = datetime.timedelta(seconds=86400.0 / per_day)
+    first = now - step * records
+    rows = []
+    for i in range(records):
+        check_in = first + step * i
+        check_out = check_in + datetime.timedelta(minutes=rng.randint(5, 480))
+        open_record = now - check_in < datetime.timedelta(hours=1)
+        rows.append((rng.randrange(1, users + 1), check_in.strftime('%Y-%m-%d %H:%M:%S'),
+                     None if open_record else check_out.strftime('%Y-%m-%d %H:%M:%S')))
+        if len(rows) == 50000:
+            conn.executemany('INSERT INTO records (user_id, check_in_time, check_out_time) VALUES (?, ?, ?)', rows)
+            rows = []
+    conn.executemany('INSERT INTO records (user_id, check_in_time, check_out_time) VALUES (?, ?, ?)', rows)
+    conn.commit()
+    return conn
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+
+def measure(conn, users, rng, repeat):
+    def check_out():
+        # The statement RecordWriter runs for every check-out event
+        with conn:
+            conn.execute("UPDATE records SET check_out_time=check_out_time WHERE user_id=? AND check_out_time IS NULL",
+                         (rng.randrange(1, users + 1),))
+
+    return (timed(lambda: reports.daily_presence(conn=conn), repeat),
+            timed(lambda: reports.open_sessions(conn=conn), repeat),
+            timed(check_out, repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report and check-out latency vs. records table size, before and after indexes")
+    parser.add_argument('--records', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--per-day', type=int, default=2000, help="check-ins per day")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'records':>9} {'indexes':>8} {'daily ms':>9} {'open ms':>8} {'check-out ms':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for records in args.records:
+            path = os.path.join(tmp, f"records{records}.db")
+            # Schema as it was before the index migration
+            migrate(path, target=2)
+            conn = populate(path, records, args.users, args.per_day, rng)
+            daily, open_ms, check_out = measure(conn, args.users, rng, args.repeat)
+            print(f"{records:>9} {'no':>8} {daily:>9.2f} {open_ms:>8.2f} {check_out:>13.2f}")
+            conn.close()
+            migrate(path)
+            conn = connect(path)
+            daily, open_ms, check_out = measure(conn, args.users, rng, args.repeat)
+            print(f"{records:>9} {'yes':>8} {daily:>9.2f} {open_ms:>8.2f} {check_out:>13.2f}")
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
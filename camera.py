@@ -0,0 +1,226 @@
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+# Seconds between pipeline statistics reports on the console
+stats_interval = 60.0
+# Network cameras (rtsp://, http://, ...) are opened with the FFmpeg backend
+rtsp_transport = 'tcp'  # or 'udp': lower latency, but drops on lossy links
+capture_buffer_size = 1
+open_timeout_ms = 5000
+read_timeout_ms = 5000
+# Failed opens/reads are retried with exponential backoff, for every source
+reconnect_initial_delay = 0.5
+reconnect_max_delay = 30.0
+# Frames per second a camera decodes for processing (None = as many as the
+# processing stage can take). Every frame is grab()bed to keep the stream
+# current, but only frames that will be used are retrieve()d (decoded and
+# converted), so CPU falls with the skip ratio.
+default_target_fps = None
+
+# FFmpeg takes its options from one process-wide environment variable,
+# so opens with different transports must not overlap
+_ffmpeg_open_lock = threading.Lock()
+
+
+def parse_source(source):
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source)
+    return source.strip() if isinstance(source, str) else source
+
+
+def is_network_source(source):
+    return isinstance(source, str) and '://' in source
+
+
+def open_capture(source, transport=None):
+    source = parse_source(source)
+    if is_network_source(source):
+        with _ffmpeg_open_lock:
+            os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = f"rtsp_transport;{transport or rtsp_transport}"
+            cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, open_timeout_ms,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, read_timeout_ms,
+            ])
+    else:
+        cap = cv2.VideoCapture(source)
+    # Keep the driver/FFmpeg queue short so a read returns a recent frame
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, capture_buffer_size)
+    return cap
+
+
+class LatestFrame:
+    """Single-slot mailbox: put() overwrites an unread frame and counts it as dropped."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._sequence = 0
+        self._read_sequence = 0
+        self._waiting = 0
+        self.dropped = 0
+
+    def wants_frame(self):
+        """True when a consumer is blocked in get() waiting for a new frame."""
+        return self._waiting > 0
+
+    def put(self, frame):
+        with self._condition:
+            if self._sequence > self._read_sequence:
+                self.dropped += 1
+            self._frame = frame
+            self._sequence += 1
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """Wait for a frame newer than the last one returned; None on timeout."""
+        with self._condition:
+            self._waiting += 1
+            try:
+                if not self._condition.wait_for(lambda: self._sequence > self._read_sequence, timeout):
+                    return None
+            finally:
+                self._waiting -= 1
+            self._read_sequence = self._sequence
+            return self._frame
+
+
+class CameraPipeline:
+    """Grab, process and render stages of one camera, each on its own thread.
+
+    The grabber grab()s as fast as the camera delivers so the driver/RTSP
+    buffer never backs up, and retrieve()s a frame only when the processing
+    stage is waiting for one and target_fps allows it. The processing stage
+    always takes the newest decoded frame and the render stage the newest
+    processed one; frames a slower stage could not keep up with are
+    dropped, never queued.
+    """
+
+    def __init__(self, source, process=None, render=None, name=None, extra_stats=None, transport=None,
+                 target_fps=None):
+        self.source = parse_source(source)
+        self.transport = transport
+        self.target_fps = target_fps if target_fps is not None else default_target_fps
+        self.process = process
+        self.render = render
+        self.name = name if name is not None else str(source)
+        self.extra_stats = extra_stats
+        self.grabbed = LatestFrame()
+        self.processed = LatestFrame()
+        self.frames_grabbed = 0
+        self.frames_decoded = 0
+        self.frames_processed = 0
+        self.frames_rendered = 0
+        self.reconnects = 0
+        self.running = False
+        self._threads = []
+
+    def start(self):
+        self.running = True
+        for target, stage in ((self._grab_loop, 'grab'), (self._process_loop, 'process'), (self._render_loop, 'render')):
+            thread = threading.Thread(target=target, name=f"camera-{self.name}-{stage}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        stats = {
+            'grabbed': self.frames_grabbed,
+            'decoded': self.frames_decoded,
+            'processed': self.frames_processed,
+            'rendered': self.frames_rendered,
+            'reconnects': self.reconnects,
+            'dropped_before_processing': self.grabbed.dropped,
+            'dropped_before_render': self.processed.dropped,
+        }
+        if self.extra_stats is not None:
+            stats.update(self.extra_stats())
+        return stats
+
+    def open_capture(self):
+        return open_capture(self.source, self.transport)
+
+    def _grab_loop(self):
+        delay = reconnect_initial_delay
+        while self.running:
+            cap = None
+            try:
+                cap = self.open_capture()
+                if not cap.isOpened():
+                    print(f"Error: Could not open camera {self.name}.")
+                else:
+                    interval = 1.0 / self.target_fps if self.target_fps else 0.0
+                    next_decode = 0.0
+                    while self.running:
+                        if not cap.grab():
+                            print(f"Error: Could not read frame from camera {self.name}.")
+                            break
+                        delay = reconnect_initial_delay
+                        self.frames_grabbed += 1
+                        now = time.monotonic()
+                        if now < next_decode or not self.grabbed.wants_frame():
+                            continue
+                        ret, frame = cap.retrieve()
+                        if not ret:
+                            continue
+                        next_decode = now + interval
+                        self.frames_decoded += 1
+                        self.grabbed.put(frame)
+            except Exception as err:
+                print(f"Error in CameraPipeline._grab_loop: {err}")
+            finally:
+                if cap is not None:
+                    cap.release()
+            if not self.running:
+                break
+            print(f"Reconnecting to camera {self.name} in {delay:.1f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, reconnect_max_delay)
+            self.reconnects += 1
+
+    def _process_loop(self):
+        next_stats = time.monotonic() + stats_interval
+        while self.running:
+            frame = self.grabbed.get(timeout=0.5)
+            if frame is None:
+                continue
+            try:
+                if self.process is not None:
+                    frame = self.process(frame)
+            except Exception as err:
+                print(f"Error in CameraPipeline._process_loop: {err}")
+            self.frames_processed += 1
+            self.processed.put(frame)
+            if time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + stats_interval
+                print(f"Camera {self.name}: {self.stats()}")
+
+    def _render_loop(self):
+        while self.running:
+            frame = self.processed.get(timeout=0.5)
+            if frame is None:
+                continue
+            try:
+                if self.render is not None:
+                    self.render(frame)
+            except Exception as err:
+                print(f"Error in CameraPipeline._render_loop: {err}")
+            self.frames_rendered += 1
+
+
+if __name__ == '__main__':
+    # Smoke test for a source: python camera.py rtsp://... [tcp|udp] [target fps], or a video file
+    pipeline = CameraPipeline(sys.argv[1], transport=sys.argv[2] if len(sys.argv) > 2 else None,
+                              target_fps=float(sys.argv[3]) if len(sys.argv) > 3 else None).start()
+    try:
+        while True:
+            time.sleep(5)
+            print(pipeline.stats())
+    except KeyboardInterrupt:
+        pipeline.stop()
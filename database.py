@@ -0,0 +1,217 @@
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+
+database_file = 'app_database.db'
+# Events are written in one transaction per batch: whichever comes first of
+# writer_batch_size queued events or writer_flush_interval seconds
+writer_batch_size = 256
+writer_flush_interval = 0.5
+# Events beyond this many waiting are dropped (and counted) rather than
+# blocking a camera thread
+writer_queue_size = 10000
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or database_file, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-16000')
+    conn.execute('PRAGMA busy_timeout=30000')
+    return conn
+
+
+def sqlite_now():
+    # Same text format as SQLite's datetime('now'), taken when the event happens
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _base_schema(conn):
+    # Databases made before migrations existed already have these tables
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admin (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            address TEXT,
+            phone TEXT,
+            email TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            check_in_time TEXT,
+            check_out_time TEXT,
+            image BLOB,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    if not conn.execute('SELECT * FROM admin').fetchone():
+        conn.execute('INSERT INTO admin (username, password) VALUES (?, ?)', ('Wahab Naseer', 'admin123'))
+
+
+def _snapshot_columns(conn):
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(records)')}
+    for column in ('snapshot', 'thumbnail'):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE records ADD COLUMN {column} TEXT")
+
+
+def _attendance_indexes(conn):
+    # Check-out: users by name, then the user's open records
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_name ON users (name)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_records_user_open ON records (user_id, check_out_time)')
+    # Reports: records by check-in time range
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_records_check_in ON records (check_in_time)')
+    conn.execute('ANALYZE')
+
+
+def _snapshot_files(conn):
+    from snapshot_store import move_record_images
+
+    if move_record_images(conn):
+        # Give the pages the images took back to the file system
+        conn.execute('VACUUM')
+
+
+def _user_labels(conn):
+    # The images/ folder (model label) of each user, see identities.py
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+    if 'label' not in columns:
+        conn.execute('ALTER TABLE users ADD COLUMN label TEXT')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_users_label ON users (label)')
+
+
+# (version, step, runs in one transaction); PRAGMA user_version records the
+# last step applied. Append new steps, never edit or reorder applied ones.
+migrations = [
+    (1, _base_schema, True),
+    (2, _snapshot_columns, True),
+    (3, _attendance_indexes, True),
+    # Commits in batches and VACUUMs, so it cannot be one transaction; it
+    # picks up where it stopped if interrupted
+    (4, _snapshot_files, False),
+    (5, _user_labels, True),
+]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(path=None, target=None):
+    """Bring the database up to the latest (or target) schema version."""
+    conn = connect(path)
+    try:
+        version = schema_version(conn)
+        for step_version, step, transactional in migrations:
+            if step_version <= version or (target is not None and step_version > target):
+                continue
+            print(f"Migrating database to version {step_version} ({step.__name__.strip('_')})")
+            if transactional:
+                conn.execute('BEGIN')
+                try:
+                    step(conn)
+                    conn.execute(f"PRAGMA user_version = {step_version}")
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+            else:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {step_version}")
+            version = step_version
+        return version
+    finally:
+        conn.close()
+
+
+class RecordWriter:
+    """Single thread owning the one long-lived write connection to the database.
+
+    Camera threads only enqueue attendance events; the writer applies them
+    in order, many per transaction.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or database_file
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self._events = queue.Queue(maxsize=writer_queue_size)
+        self._thread = threading.Thread(target=self._run, name='record-writer', daemon=True)
+        self._thread.start()
+
+    def _put(self, event):
+        try:
+            self._events.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def check_in(self, user_id, snapshot=None, thumbnail=None, timestamp=None):
+        """user_id is None for unknown faces; snapshot and thumbnail are snapshot_store paths."""
+        self._put(('check_in', user_id, timestamp or sqlite_now(), snapshot, thumbnail))
+
+    def check_out(self, user_id, timestamp=None):
+        self._put(('check_out', user_id, timestamp or sqlite_now(), None, None))
+
+    def flush(self, timeout=None):
+        """Block until every event queued so far has been committed."""
+        done = threading.Event()
+        self._events.put(('flush', done, None, None, None))
+        return done.wait(timeout)
+
+    def stats(self):
+        return {'written': self.written, 'batches': self.batches, 'dropped': self.dropped,
+                'queued': self._events.qsize()}
+
+    def _apply(self, cursor, event):
+        kind, user_id, timestamp, snapshot, thumbnail = event
+        if kind == 'check_in':
+            cursor.execute(
+                "INSERT INTO records (user_id, check_in_time, snapshot, thumbnail) VALUES (?, ?, ?, ?)",
+                (user_id, timestamp, snapshot, thumbnail))
+        elif kind == 'check_out':
+            cursor.execute(
+                "UPDATE records SET check_out_time=? WHERE user_id=? AND check_out_time IS NULL",
+                (timestamp, user_id))
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            batch = [self._events.get()]
+            deadline = time.monotonic() + writer_flush_interval
+            while len(batch) < writer_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._events.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            waiters = [event[1] for event in batch if event[0] == 'flush']
+            events = [event for event in batch if event[0] != 'flush']
+            try:
+                if events:
+                    with conn:
+                        cursor = conn.cursor()
+                        for event in events:
+                            self._apply(cursor, event)
+                    self.written += len(events)
+                    self.batches += 1
+            except Exception as err:
+                print(f"Error in RecordWriter: {err}")
+            for waiter in waiters:
+                waiter.set()
@@ -0,0 +1,93 @@
+import sqlite3
+
+import face_recognition
+import numpy as np
+
+from image_io import max_decode_side
+
+# Kept out of app_database.db so bulk training writes never contend with attendance records
+cache_file = 'encoding_cache.db'
+cache_schema_version = 1
+# Anything that changes what an encoding would be for the same file bytes
+encoder_settings = f"hog/upsample=1/jitters=1/max_side={max_decode_side}"
+
+
+def encoder_version():
+    library_version = getattr(face_recognition, '__version__', 'unknown')
+    return f"{cache_schema_version}:face_recognition-{library_version}:{encoder_settings}"
+
+
+class EncodingCache:
+    """Content hash -> (face box, encoding) store for training images.
+
+    Images without a face are cached too (encoding None) so they are not
+    retried on every build. A change of encoder_version() empties the cache.
+    """
+
+    def __init__(self, path=cache_file):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS encodings (
+                hash TEXT PRIMARY KEY,
+                top INTEGER,
+                right INTEGER,
+                bottom INTEGER,
+                left INTEGER,
+                encoding BLOB
+            )
+        ''')
+        version = encoder_version()
+        row = self.conn.execute("SELECT value FROM meta WHERE key='encoder_version'").fetchone()
+        if row is None or row[0] != version:
+            if row is not None:
+                print(f"Encoder changed ({row[0]} -> {version}), clearing encoding cache.")
+            self.conn.execute('DELETE FROM encodings')
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('encoder_version', ?)", (version,))
+        self.conn.commit()
+
+    def get_many(self, hashes):
+        found = {}
+        hashes = list(hashes)
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, top, right, bottom, left, encoding FROM encodings WHERE hash IN ({','.join('?' * len(chunk))})",
+                chunk)
+            for digest, top, right, bottom, left, blob in rows:
+                if blob is None:
+                    found[digest] = None
+                else:
+                    found[digest] = ((top, right, bottom, left), np.frombuffer(blob, dtype=np.float64).copy())
+        return found
+
+    def put_many(self, items):
+        rows = []
+        for digest, result in items:
+            if result is None:
+                rows.append((digest, None, None, None, None, None))
+            else:
+                (top, right, bottom, left), encoding = result
+                rows.append((digest, top, right, bottom, left,
+                             np.asarray(encoding, dtype=np.float64).tobytes()))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO encodings (hash, top, right, bottom, left, encoding) VALUES (?, ?, ?, ?, ?, ?)",
+            rows)
+        self.conn.commit()
+
+    def evict_except(self, keep_hashes):
+        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS keep (hash TEXT PRIMARY KEY)')
+        self.conn.execute('DELETE FROM keep')
+        self.conn.executemany('INSERT OR IGNORE INTO keep (hash) VALUES (?)', ((digest,) for digest in keep_hashes))
+        evicted = self.conn.execute('DELETE FROM encodings WHERE hash NOT IN (SELECT hash FROM keep)').rowcount
+        self.conn.execute('DELETE FROM keep')
+        self.conn.commit()
+        return evicted
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,91 @@
+import itertools
+import queue
+import threading
+
+from training import enroll_images
+
+_job_ids = itertools.count(1)
+
+
+class EnrollmentConflict(Exception):
+    pass
+
+
+class EnrollmentJob:
+    def __init__(self, person, image_paths, on_progress=None):
+        self.id = next(_job_ids)
+        self.person = person
+        self.image_paths = list(image_paths)
+        self.on_progress = on_progress
+        self.state = 'queued'  # then 'running', and 'done' or 'failed'
+        self.done = 0
+        self.total = len(self.image_paths)
+        self.message = f"Waiting to enroll {person}"
+        self.finished = threading.Event()
+
+    def fraction(self):
+        return self.done / self.total if self.total else 0.0
+
+    def _report(self, state=None, message=None):
+        if state is not None:
+            self.state = state
+        if message is not None:
+            self.message = message
+        if self.on_progress is not None:
+            try:
+                self.on_progress(self)
+            except Exception as err:
+                print(f"Error in EnrollmentJob.on_progress: {err}")
+
+    def progress(self, done, total, images_per_second):
+        # Same signature as training.print_progress
+        self.done, self.total = done, total
+        if done < total:
+            self._report(message=f"Encoded {done}/{total} images ({images_per_second:.1f} images/sec)")
+        else:
+            self._report(message="Updating model")
+
+
+class EnrollmentQueue:
+    """Runs enrollments one at a time on a background thread.
+
+    Cameras keep matching against the gallery they have until the new model
+    generation is written and swapped in. A second job for a person who
+    already has one queued or running is rejected with EnrollmentConflict.
+    """
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._active = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name='enrollment', daemon=True).start()
+
+    def submit(self, person, image_paths, on_progress=None):
+        job = EnrollmentJob(person, image_paths, on_progress)
+        with self._lock:
+            if person in self._active:
+                raise EnrollmentConflict(f"Enrollment for {person} is already in progress")
+            self._active[person] = job
+        job._report()
+        self._jobs.put(job)
+        return job
+
+    def active_jobs(self):
+        with self._lock:
+            return list(self._active.values())
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            job._report('running', f"Enrolling {job.person}")
+            try:
+                enroll_images(job.person, job.image_paths, progress=job.progress)
+                job.done = job.total
+                job._report('done', f"Enrolled {job.person}")
+            except Exception as err:
+                print(f"Error in EnrollmentQueue: {err}")
+                job._report('failed', f"Enrollment of {job.person} failed: {err}")
+            finally:
+                with self._lock:
+                    self._active.pop(job.person, None)
+                job.finished.set()
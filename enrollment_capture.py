@@ -0,0 +1,166 @@
+import threading
+import time
+
+import cv2
+import face_recognition
+import numpy as np
+
+import recognition
+
+# Enrollment samples the live registration stream for capture_duration
+# seconds at capture_sample_fps, then keeps the enrollment_shots most useful
+# frames
+capture_duration = 4.0
+capture_sample_fps = 4.0
+enrollment_shots = 5
+# Frames are rejected outright when the face is smaller than min_face_size
+# pixels wide, or blurrier than min_sharpness (variance of the Laplacian of
+# the grey face crop); frames with zero or several faces are rejected too
+min_face_size = 80
+min_sharpness = 60.0
+# Faces this wide and this sharp score full marks for size and sharpness
+ideal_face_size = 200
+ideal_sharpness = 300.0
+# A shot closer than duplicate_distance to an already kept one (in encoding
+# space) adds nothing; novelty counts fully from novelty_distance upwards
+duplicate_distance = 0.06
+novelty_distance = 0.25
+# Weight of head pose difference (yaw/roll, roughly -1..1) in the choice
+pose_weight = 2.0
+
+
+class Shot:
+    def __init__(self, frame, box, encoding, sharpness, pose):
+        self.frame = frame
+        self.box = box
+        self.encoding = encoding
+        self.sharpness = sharpness
+        self.pose = pose
+        top, right, bottom, left = box
+        self.face_size = right - left
+        self.quality = (min(1.0, sharpness / ideal_sharpness) *
+                        min(1.0, self.face_size / float(ideal_face_size)))
+
+
+def sharpness(gray_face):
+    return float(cv2.Laplacian(gray_face, cv2.CV_64F).var())
+
+
+def head_pose(landmarks):
+    """(yaw, roll) estimate from 2-D landmarks: nose offset from the eye midpoint, eye line angle."""
+    left_eye = np.mean(landmarks['left_eye'], axis=0)
+    right_eye = np.mean(landmarks['right_eye'], axis=0)
+    nose = np.mean(landmarks['nose_tip'], axis=0)
+    eye_vector = right_eye - left_eye
+    eye_distance = max(float(np.hypot(*eye_vector)), 1.0)
+    yaw = float(nose[0] - (left_eye[0] + right_eye[0]) / 2.0) / eye_distance
+    roll = float(np.arctan2(eye_vector[1], eye_vector[0]))
+    return np.array([yaw, roll])
+
+
+def score_frame(frame):
+    """Return a Shot for a BGR frame with one usable face, else None."""
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    boxes = recognition.detect_faces(rgb, 1.0)
+    if len(boxes) != 1:
+        return None
+    box = boxes[0]
+    top, right, bottom, left = box
+    if right - left < min_face_size:
+        return None
+    gray = cv2.cvtColor(frame[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+    face_sharpness = sharpness(gray)
+    if face_sharpness < min_sharpness:
+        return None
+    landmarks = face_recognition.face_landmarks(rgb, [box])
+    encodings = recognition.encode_faces(rgb, [box], 1.0)
+    if not landmarks or not encodings:
+        return None
+    return Shot(frame, box, np.asarray(encodings[0]), face_sharpness, head_pose(landmarks[0]))
+
+
+def select_shots(shots, count=None, known_encodings=()):
+    """Greedily keep the count shots with the best quality x novelty x pose variety.
+
+    known_encodings (e.g. the person's existing gallery rows) count as
+    already kept for novelty.
+    """
+    count = count or enrollment_shots
+    kept = []
+    kept_encodings = [np.asarray(encoding) for encoding in known_encodings]
+    candidates = list(shots)
+    while candidates and len(kept) < count:
+        best, best_value = None, 0.0
+        for shot in candidates:
+            novelty = 1.0
+            variety = 1.0
+            if kept_encodings:
+                nearest = min(float(np.linalg.norm(shot.encoding - encoding)) for encoding in kept_encodings)
+                if nearest < duplicate_distance:
+                    continue
+                novelty = min(1.0, nearest / novelty_distance)
+            if kept:
+                variety += pose_weight * min(float(np.linalg.norm(shot.pose - other.pose)) for other in kept)
+            value = shot.quality * novelty * variety
+            if value > best_value:
+                best, best_value = shot, value
+        if best is None:
+            break
+        kept.append(best)
+        kept_encodings.append(best.encoding)
+        candidates.remove(best)
+    return kept
+
+
+class ShotCollector:
+    """Samples frames from a running camera pipeline for enrollment.
+
+    Pass offer as the pipeline's per-frame hook; it only copies a frame while
+    collect() is running and one is due, so the preview is unaffected.
+    """
+
+    def __init__(self, duration=None, sample_fps=None):
+        self.duration = duration or capture_duration
+        self.interval = 1.0 / (sample_fps or capture_sample_fps)
+        self._frames = []
+        self._lock = threading.Lock()
+        self._active = False
+        self._next_sample = 0.0
+
+    def offer(self, frame):
+        if not self._active:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._active and now >= self._next_sample:
+                self._next_sample = now + self.interval
+                self._frames.append(frame.copy())
+
+    def collect(self):
+        """Block for the sampling window and return the frames sampled."""
+        with self._lock:
+            self._frames = []
+            self._next_sample = 0.0
+            self._active = True
+        time.sleep(self.duration)
+        with self._lock:
+            self._active = False
+            frames, self._frames = self._frames, []
+        return frames
+
+
+def capture_shots(collector, count=None, progress=None):
+    """Sample the stream, score every frame and return the selected Shots and the number sampled."""
+    frames = collector.collect()
+    shots = []
+    for done, frame in enumerate(frames, 1):
+        try:
+            shot = score_frame(frame)
+        except Exception as err:
+            print(f"Error in score_frame: {err}")
+            shot = None
+        if shot is not None:
+            shots.append(shot)
+        if progress is not None:
+            progress(done, len(frames))
+    return select_shots(shots, count), len(frames)
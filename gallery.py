@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from ann_index import index_file_for, load_index_file
+from model_store import current_model_path, read_model_file
+
+# How often (seconds) camera threads are allowed to stat the model file
+reload_check_interval = 1.0
+
+
+class GallerySnapshot:
+    """Read-only view of the trained model shared by all camera threads."""
+
+    def __init__(self, encodings, labels, version, index=None, user_ids=None):
+        self.index = index
+        # label -> users.id carried by the model file
+        self.user_ids = dict(user_ids or {})
+        self.encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, 128)
+        self.labels = np.asarray(labels, dtype=object)
+        self.version = version
+        self.squared_norms = np.einsum('ij,ij->i', self.encodings, self.encodings)
+        self.encodings.setflags(write=False)
+        self.labels.setflags(write=False)
+        self.squared_norms.setflags(write=False)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def distances(self, face_encodings):
+        # Euclidean distances of every query face to every gallery row, as a
+        # (faces x gallery) matrix built from one matrix product.
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        query_norms = np.einsum('ij,ij->i', queries, queries)
+        squared = query_norms[:, None] + self.squared_norms[None, :] - 2.0 * (queries @ self.encodings.T)
+        np.maximum(squared, 0.0, out=squared)
+        return np.sqrt(squared, out=squared)
+
+    def match(self, face_encodings, tolerance):
+        """Return (label, distance) of the nearest gallery entry for each face.
+
+        label is None when the nearest entry is farther than tolerance.
+        """
+        if not len(face_encodings):
+            return []
+        if not len(self):
+            return [(None, float('inf')) for _ in face_encodings]
+        if self.index is not None:
+            best, best_distances = self.index.search(self.encodings, self.squared_norms, face_encodings)
+        else:
+            distances = self.distances(face_encodings)
+            best = np.argmin(distances, axis=1)
+            best_distances = distances[np.arange(len(best)), best]
+        results = []
+        for index, distance in zip(best, best_distances):
+            distance = float(distance)
+            results.append((self.labels[index] if distance <= tolerance else None, distance))
+        return results
+
+
+EMPTY_SNAPSHOT = GallerySnapshot(np.empty((0, 128), dtype=np.float32), [], None)
+
+
+class Gallery:
+    """Loads the trained model once and swaps it in when a new generation appears.
+
+    Readers call current() and get an immutable snapshot; replacing the
+    snapshot is a single attribute assignment, so the hot path never locks.
+    The encodings are memory-mapped, so processes share the same pages.
+    """
+
+    def __init__(self, model_file):
+        self.model_file = model_file
+        self._snapshot = EMPTY_SNAPSHOT
+        self._load_lock = threading.Lock()
+        self._next_check = 0.0
+        self.reload()
+
+    def current(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + reload_check_interval
+            if self._file_version() != self._snapshot.version:
+                self.reload()
+        return self._snapshot
+
+    def notify(self):
+        self._next_check = 0.0
+        self.reload()
+
+    def reload(self):
+        with self._load_lock:
+            version = self._file_version()
+            if version is None or version == self._snapshot.version:
+                return self._snapshot
+            path = version[0]
+            try:
+                faces_encodings, labels, user_ids = read_model_file(path)
+                snapshot = GallerySnapshot(faces_encodings, labels, version, user_ids=user_ids)
+                snapshot.index = load_index_file(index_file_for(path), snapshot.encodings)
+                self._snapshot = snapshot
+                print(f"Gallery loaded: {len(labels)} encodings from {path}")
+            except Exception as err:
+                print(f"Error in Gallery.reload: {err}")
+            return self._snapshot
+
+    def _file_version(self):
+        path = current_model_path(self.model_file)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+
+_galleries = {}
+_galleries_lock = threading.Lock()
+
+
+def get_gallery(model_file):
+    key = os.path.abspath(model_file)
+    with _galleries_lock:
+        if key not in _galleries:
+            _galleries[key] = Gallery(model_file)
+        return _galleries[key]
+
+
+def notify_model_changed(model_file):
+    key = os.path.abspath(model_file)
+    gallery = _galleries.get(key)
+    if gallery is not None:
+        gallery.notify()
@@ -0,0 +1,107 @@
+import os
+import re
+import threading
+
+from database import connect
+
+# Every user is linked to the folder under images/ that holds their training
+# images through users.label; the model's labels are those folder names.
+images_folder = 'images'
+
+
+def normalize_label(text):
+    """Folder names and user names compare equal ignoring case, '_', '-' and spacing."""
+    return ' '.join(part for part in re.split(r'[\s_\-]+', str(text).casefold()) if part)
+
+
+def assign_label(conn, user_id, name):
+    """Link a newly inserted user to a folder named after them; returns the label.
+
+    A name already used as another user's label, or by an existing folder
+    (possibly someone not linked yet), gets the user id appended.
+    """
+    label = name
+    if (conn.execute('SELECT 1 FROM users WHERE label=? AND id<>?', (label, user_id)).fetchone()
+            or os.path.isdir(os.path.join(images_folder, label))):
+        label = f"{name}_{user_id}"
+    conn.execute('UPDATE users SET label=? WHERE id=?', (label, user_id))
+    return label
+
+
+def link_labels(labels, path=None):
+    """Return {label: user id or None}, linking unlinked users whose name matches a label."""
+    labels = sorted(set(labels))
+    conn = connect(path)
+    try:
+        with conn:
+            linked = dict(conn.execute('SELECT label, id FROM users WHERE label IS NOT NULL'))
+            unlinked = {}
+            for user_id, name in conn.execute('SELECT id, name FROM users WHERE label IS NULL'):
+                unlinked.setdefault(normalize_label(name), []).append(user_id)
+            for label in labels:
+                if label in linked:
+                    continue
+                candidates = unlinked.get(normalize_label(label), [])
+                # Two users with the same name cannot be told apart; leave both unlinked
+                if len(candidates) == 1:
+                    linked[label] = candidates.pop()
+                    conn.execute('UPDATE users SET label=? WHERE id=?', (label, linked[label]))
+                    print(f"Linked face label {label!r} to user {linked[label]}")
+    finally:
+        conn.close()
+    missing = [label for label in labels if label not in linked]
+    if missing:
+        print(f"No user for face labels: {', '.join(missing)}")
+    notify_users_changed()
+    return {label: linked.get(label) for label in labels}
+
+
+class IdentityMap:
+    """In-memory label -> users.id for the camera threads.
+
+    Read from the database on creation and on notify_users_changed(); the
+    lookup itself is a dict access, with the ids carried by the model as
+    fallback for labels the database does not link (yet).
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._ids = {}
+        self._load_lock = threading.Lock()
+        self.reload()
+
+    def user_id(self, label, snapshot=None):
+        if label is None:
+            return None
+        user_id = self._ids.get(label)
+        if user_id is None and snapshot is not None:
+            user_id = snapshot.user_ids.get(label)
+        return user_id
+
+    def reload(self):
+        with self._load_lock:
+            try:
+                conn = connect(self.path)
+                try:
+                    self._ids = dict(conn.execute('SELECT label, id FROM users WHERE label IS NOT NULL'))
+                finally:
+                    conn.close()
+            except Exception as err:
+                print(f"Error in IdentityMap.reload: {err}")
+
+
+_identity_map = None
+_identity_map_lock = threading.Lock()
+
+
+def get_identity_map():
+    global _identity_map
+    with _identity_map_lock:
+        if _identity_map is None:
+            _identity_map = IdentityMap()
+        return _identity_map
+
+
+def notify_users_changed():
+    if _identity_map is not None:
+        _identity_map.reload()
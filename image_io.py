@@ -0,0 +1,79 @@
+import os
+import struct
+
+import cv2
+
+image_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+# Longest side the face detector needs; bigger sources are decoded at 1/2, 1/4 or 1/8
+max_decode_side = 1280
+
+_reduced_flags = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def sniff_image_type(header):
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header.startswith(b'BM'):
+        return 'bmp'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _jpeg_size(file):
+    file.seek(2)
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        # SOF0..SOF15 carry the frame size; C4/C8/CC are other segment types
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            segment = file.read(7)
+            if len(segment) < 7:
+                return None
+            height, width = struct.unpack('>HH', segment[3:7])
+            return width, height
+        length = file.read(2)
+        if len(length) < 2:
+            return None
+        file.seek(struct.unpack('>H', length)[0] - 2, os.SEEK_CUR)
+
+
+def image_info(img_path):
+    """Return (type, (width, height) or None) from the file header, or (None, None)."""
+    if not img_path.lower().endswith(image_extensions):
+        return None, None
+    try:
+        with open(img_path, 'rb') as file:
+            header = file.read(26)
+            image_type = sniff_image_type(header)
+            if image_type == 'png' and header[12:16] == b'IHDR':
+                return image_type, struct.unpack('>II', header[16:24])
+            if image_type == 'bmp' and len(header) >= 26:
+                width, height = struct.unpack('<ii', header[18:26])
+                return image_type, (width, abs(height))
+            if image_type == 'jpeg':
+                return image_type, _jpeg_size(file)
+            return image_type, None
+    except OSError:
+        return None, None
+
+
+def read_image(img_path, max_side=max_decode_side):
+    """Decode an image file, at reduced resolution when it is larger than needed.
+
+    Returns None for files that are not images or cannot be decoded.
+    """
+    image_type, size = image_info(img_path)
+    if image_type is None:
+        return None
+    flags = cv2.IMREAD_COLOR
+    if size is not None and max_side:
+        longest = max(size)
+        for factor, reduced_flag in _reduced_flags:
+            if longest // factor >= max_side:
+                flags = reduced_flag
+                break
+    return cv2.imread(img_path, flags)
@@ -1,97 +1,46 @@
 import cv2
 import base64
-import pickle
 import sqlite3
 from flet import *
-import threading
-import face_recognition
 import os
 import winsound
 import datetime
+import multiprocessing
+import threading
+from gallery import get_gallery
+from model_store import current_model_path
+from recognition_service import InProcessRecognizer, RecognitionService
+from tracking import FaceTracker
+from camera import CameraPipeline
+from render import RenderScheduler
+from database import RecordWriter, migrate
+from identities import assign_label, get_identity_map, link_labels, notify_users_changed
+from attendance import AttendanceEvents
+from snapshot_store import store_event_snapshot
+from training import trained_model_file, train_model, import_legacy_model
+from enrollment import EnrollmentConflict, EnrollmentQueue
+from enrollment_capture import ShotCollector, capture_shots
 
-trained_model_file = 'trained_model.pkl'
 face_recognition_tolerance = 0.5
+# Face detection scale by camera source (device index or stream URL), see
+# recognition.detection_scale. Add Camera can also set it per camera.
+camera_detection_scale = {1: 1.0, 2: 1.0}
+# Run detection every few frames and track faces in between, see tracking.py
+tracking_enabled = True
+# Frames per second each camera decodes for recognition (None = as fast as
+# recognition keeps up), by camera source (device index or stream URL); see
+# camera.default_target_fps. Add Camera can also set it per camera.
+camera_target_fps = {1: None, 2: None}
+# Run detection/encoding for all cameras on a shared process pool instead of
+# in each camera's thread, see recognition_service.py
+recognition_processes = True
+# Space around the camera feeds (page padding; header and label rows), in
+# pixels: previews are encoded at the page size minus this, split per feed
+camera_row_margin = (40, 100)
 frequency = 2300  # Set the frequency in Hertz
 duration = 1300  # Set the duration in milliseconds
 
-def create_database():
-    conn = sqlite3.connect('app_database.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS admin (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            password TEXT NOT NULL
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            address TEXT,
-            phone TEXT,
-            email TEXT
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            check_in_time TEXT,
-            check_out_time TEXT,
-            image BLOB,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-
-    cursor.execute('SELECT * FROM admin')
-    if not cursor.fetchone():
-        cursor.execute('INSERT INTO admin (username, password) VALUES (?, ?)', ('Wahab Naseer', 'admin123'))
-
-    conn.commit()
-    conn.close()
-
-def load_images_from_folder(folder):
-    images = []
-    for filename in os.listdir(folder):
-        img_path = os.path.join(folder, filename)
-        if os.path.isfile(img_path):
-            img = cv2.imread(img_path)
-            if img is not None:
-                images.append(img)
-    return images
-
-def prepare_training_data(data_folder):
-    labels = []
-    faces_encodings = []
-
-    for person_name in os.listdir(data_folder):
-        person_folder = os.path.join(data_folder, person_name)
-        if os.path.isdir(person_folder):
-            images = load_images_from_folder(person_folder)
-            for image in images:
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                face_locations = face_recognition.face_locations(rgb_image)
-                if face_locations:
-                    encodings = face_recognition.face_encodings(rgb_image, face_locations)
-                    if encodings:
-                        faces_encodings.append(encodings[0])
-                        labels.append(person_name)
-    return faces_encodings, labels
-
-def train_model():
-    data_folder = 'images'
-    faces_encodings, labels = prepare_training_data(data_folder)
-    with open(trained_model_file, 'wb') as file:
-        pickle.dump((faces_encodings, labels), file)
-    print("Model trained and saved.")
-
-if not os.path.isfile(trained_model_file):
-    train_model()
-
 def main(page: Page):
-    create_database()
-
     num_pictures_input = TextField(label="Number of Pictures", value="5")
     tolerance_input = TextField(label="Tolerance", value=str(face_recognition_tolerance))
     
@@ -123,87 +72,116 @@ def main(page: Page):
         except Exception as err:
             print(f"Error in restore: {err}")
 
+    renderer = RenderScheduler(page)
+
     def update_frame(image_control, frame):
         try:
-            img = cv2.imencode('.jpg', frame)[1].tobytes()
-            image_control.src_base64 = base64.b64encode(img).decode('utf-8')
-            page.update()
+            renderer.submit(image_control, frame)
         except Exception as err:
             print(f"Error in update_frame: {err}")
 
-    def capture_frames(image_control, camera_index, detect_faces=False, camera_type='entry'):
-        try:
-            cap = cv2.VideoCapture(camera_index)
-            if not cap.isOpened():
-                print(f"Error: Could not open camera {camera_index}.")
-                return
-
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    print(f"Error: Could not read frame from camera {camera_index}.")
-                    break
+    def capture_frames(image_control, camera_index, detect_faces=False, camera_type='entry', mirror=True, transport=None,
+                       sample=None, target_fps=None, detection_scale=None):
+        # Grabbing, recognition and rendering run as separate stages so a slow
+        # recognizer drops frames instead of letting the feed lag behind
+        tracker = FaceTracker() if detect_faces and tracking_enabled else None
+        if detection_scale is None:
+            detection_scale = camera_detection_scale.get(camera_index)
+        recognizer = None
+        events = None
+        if detect_faces:
+            recognizer = recognition_pool.client() if recognition_pool is not None else InProcessRecognizer()
+            events = AttendanceEvents(camera_type, record_attendance)
+
+        def extra_stats():
+            stats = tracker.stats() if tracker is not None else {}
+            if events is not None:
+                stats.update(events.stats())
+            return stats
+
+        def process(frame):
+            # sample sees the frame as the camera delivers it, before mirroring
+            if sample is not None:
+                sample(frame)
+            if mirror:
                 frame = cv2.flip(frame, 1)
-                if detect_faces:
-                    frame = recognize_faces(frame, camera_type)
-                update_frame(image_control, frame)
+            if detect_faces:
+                frame = recognize_faces(frame, camera_type, tracker, recognizer, events, detection_scale)
+            return frame
 
-            cap.release()
-        except Exception as err:
-            print(f"Error in capture_frames: {err}")
-    
-    now = datetime.datetime.now()
+        return CameraPipeline(
+            camera_index,
+            process=process,
+            render=lambda frame: update_frame(image_control, frame),
+            extra_stats=extra_stats,
+            transport=transport,
+            target_fps=target_fps if target_fps is not None else camera_target_fps.get(camera_index),
+        ).start()
 
-    def recognize_faces(frame, camera_type):
+    now = datetime.datetime.now()
+    face_gallery = get_gallery(trained_model_file)
+    # Link users to the labels of a model trained before users had labels
+    link_labels(face_gallery.current().labels)
+    identity_map = get_identity_map()
+    recognition_pool = RecognitionService() if recognition_processes else None
+    # All camera record writes go through one connection, in batched transactions
+    record_writer = RecordWriter()
+    # Enrollment encodes and rebuilds the model in the background; cameras
+    # keep the current gallery until the new one is written
+    enrollment_jobs = EnrollmentQueue()
+
+    def draw_face(frame, box, name, distance):
+        top, right, bottom, left = box
+        color = (0, 0, 255) if name is None else (0, 255, 0)
+        cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+        cv2.putText(frame, f"{name or 'Unknown'} ({distance:.2f})", (left + 6, bottom - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+    def record_attendance(event):
+        # One call per presence (see attendance.py), with the best frame of it
+        user_id = identity_map.user_id(event.name, face_gallery.current())
+        if event.name is not None and user_id is None:
+            print(f"No user linked to face label {event.name!r}")
+        if event.kind == 'check_in':
+            snapshot, thumbnail = store_event_snapshot(event.snapshot, event.box)
+            record_writer.check_in(user_id, snapshot, thumbnail, event.timestamp)
+        elif event.kind == 'check_out' and user_id is not None:
+            record_writer.check_out(user_id, event.timestamp)
+        elif event.kind == 'unknown_exit':
+            print("No matching entry for exit detected. ",now)
+            winsound.Beep(frequency, duration)
+
+    def recognize_faces(frame, camera_type, tracker=None, recognizer=None, events=None, scale=None):
         try:
-            if not os.path.isfile(trained_model_file):
+            gallery = face_gallery.current()
+            if not len(gallery):
                 return frame
 
-            with open(trained_model_file, 'rb') as file:
-                faces_encodings, labels = pickle.load(file)
+            # Between detections the tracker only moves the boxes it already has
+            if tracker is not None and not tracker.begin_frame(frame):
+                for track in tracker.tracks:
+                    draw_face(frame, track.box, track.name, track.distance)
+                return frame
 
+            recognizer = recognizer or InProcessRecognizer()
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame)
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
-            conn = sqlite3.connect('app_database.db')
-            cursor = conn.cursor()
+            face_locations = recognizer.detect(rgb_frame, scale)
+            if tracker is None:
+                face_encodings = recognizer.encode(face_locations, scale)
+                matches = gallery.match(face_encodings, face_recognition_tolerance)
+                faces = [(None, box, name, distance) for box, (name, distance) in zip(face_locations, matches)]
+            else:
+                # Tracks already identified with confidence skip the encoder
+                tracks = tracker.associate(face_locations)
+                pending = tracker.needs_encoding(tracks, gallery.version)
+                face_encodings = recognizer.encode([track.box for track in pending], scale)
+                tracker.set_identities(pending, gallery.match(face_encodings, face_recognition_tolerance), gallery.version)
+                faces = [(track.id, track.box, track.name, track.distance) for track in tracks]
 
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                matches = face_recognition.compare_faces(faces_encodings, face_encoding, tolerance=face_recognition_tolerance)
-                name = "Unknown"
-                color = (0, 0, 255)
-
-                if True in matches:
-                    first_match_index = matches.index(True)
-                    name = labels[first_match_index]
-                    color = (0, 255, 0)
-
-                    if camera_type == 'entry':
-                        cursor.execute(
-                            "INSERT INTO records (user_id, check_in_time, image) VALUES ((SELECT id FROM users WHERE name=?), datetime('now'), ?)",
-                            (name, sqlite3.Binary(cv2.imencode('.jpg', frame)[1].tobytes()))
-                        )
-                    elif camera_type == 'exit':
-                        cursor.execute(
-                            "UPDATE records SET check_out_time=datetime('now') WHERE user_id=(SELECT id FROM users WHERE name=?) AND check_out_time IS NULL",
-                            (name,)
-                        )
-                else:
-                    if camera_type == 'entry':
-                        cursor.execute(
-                            "INSERT INTO records (user_id, check_in_time, image) VALUES (NULL, datetime('now'), ?)",
-                            (sqlite3.Binary(cv2.imencode('.jpg', frame)[1].tobytes()),)
-                        )
-                    elif camera_type == 'exit':
-                        print("No matching entry for exit detected. ",now)
-                        winsound.Beep(frequency, duration)
-
-                cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-                cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+            if events is not None:
+                events.observe(frame, [(key, name, box, distance) for key, box, name, distance in faces])
 
-            conn.commit()
-            conn.close()
+            for _, box, name, distance in faces:
+                draw_face(frame, box, name, distance)
 
             return frame
         
@@ -223,16 +201,16 @@ def main(page: Page):
 
             conn = sqlite3.connect('app_database.db')
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM users WHERE name=?", (search_name,))
+            cursor.execute("SELECT id, name, address, phone, email, label FROM users WHERE name=?", (search_name,))
             user = cursor.fetchone()
             conn.close()
 
             if user:
-                user_id, name, address, phone, email = user
+                user_id, name, address, phone, email, label = user
 
-                # Find the user's image
+                # Find the user's image, in the folder their label links them to
                 user_image_path = None
-                user_folder = os.path.join('images', name)
+                user_folder = os.path.join('images', label or name)
                 if os.path.exists(user_folder):
                     for filename in os.listdir(user_folder):
                         if filename.endswith(".jpg") or filename.endswith(".png"):
@@ -289,8 +267,23 @@ def main(page: Page):
 
     
 
+    # Pipelines of cameras added from Add Camera, by source
+    added_cameras = {}
+
     def add_camera(e):
         rtsp_link_input = TextField(label="Enter RTSP Link")
+        camera_type_input = Dropdown(
+            label="Camera Type",
+            value='entry',
+            options=[dropdown.Option('entry', "Entry"), dropdown.Option('exit', "Exit")],
+        )
+        transport_input = Dropdown(
+            label="RTSP Transport",
+            value='tcp',
+            options=[dropdown.Option('tcp', "TCP"), dropdown.Option('udp', "UDP")],
+        )
+        target_fps_input = TextField(label="Target FPS (empty = as fast as recognition keeps up)")
+        detection_scale_input = TextField(label="Detection Scale (e.g. 0.5 for high-resolution streams)", value="1.0")
 
         def save_camera(e):
             rtsp_link = rtsp_link_input.value
@@ -298,25 +291,60 @@ def main(page: Page):
                 print("Error: RTSP Link field is empty.")
                 return
 
-            # Create a new Image control for the third camera feed
-            new_webcam_image = Image(expand=True)
+            if rtsp_link.strip() in added_cameras:
+                print(f"Error: Camera {rtsp_link} is already added.")
+                return
+            try:
+                target_fps = float(target_fps_input.value) if (target_fps_input.value or '').strip() else None
+            except ValueError:
+                print("Error: Target FPS must be a number.")
+                return
+            if target_fps is not None and target_fps <= 0:
+                print("Error: Target FPS must be positive.")
+                return
+            try:
+                detection_scale = float(detection_scale_input.value or 1.0)
+            except ValueError:
+                print("Error: Detection Scale must be a number.")
+                return
+            if not 0 < detection_scale <= 1:
+                print("Error: Detection Scale must be between 0 and 1.")
+                return
+            # Claimed before anything slow, so a second Save click is rejected
+            added_cameras[rtsp_link.strip()] = None
 
-            # Start a new thread to capture frames from the new camera (adjust camera_index as needed)
-            threading.Thread(target=capture_frames, args=(new_webcam_image, 3, True, rtsp_link), daemon=True).start()
+            # Create a new Image control for the added camera feed
+            new_webcam_image = Image(expand=True)
 
-            # Append the new camera feed to the existing view
-            first_page_contents.controls.append(
-                Container(
+            # Append the new camera feed next to the entry/exit cameras
+            camera_row.controls.append(
+                Column(
                     expand=True,
                     alignment=alignment.center,
-                    content=new_webcam_image,
+                    controls=[
+                        Text(f"{camera_type_input.value.capitalize()} Camera ({rtsp_link})"),
+                        Container(
+                            expand=True,
+                            alignment=alignment.center,
+                            content=new_webcam_image,
+                        ),
+                    ],
                 )
             )
 
+            resize_camera_previews()
+
             # Close the dialog box
             add_camera_dialog.open = False
             page.update()
 
+            # Stream the network camera once its preview is on the page; a
+            # local device index or video file also works
+            added_cameras[rtsp_link.strip()] = capture_frames(
+                new_webcam_image, rtsp_link, True, camera_type_input.value,
+                mirror=False, transport=transport_input.value, target_fps=target_fps,
+                detection_scale=detection_scale)
+
         save_button = ElevatedButton(text="Save", on_click=save_camera)
         close_button = IconButton(icon=icons.CLOSE, on_click=lambda e: close_add_camera_dialog())
 
@@ -329,6 +357,10 @@ def main(page: Page):
             title=Text("Add Camera"),
             content=Column(controls=[
                 rtsp_link_input,
+                camera_type_input,
+                transport_input,
+                target_fps_input,
+                detection_scale_input,
                 save_button,
             ]),
             actions=[close_button]
@@ -346,32 +378,66 @@ def main(page: Page):
         email_input = TextField(label="Email")
         captured_images = []
         capture_in_progress = [False]
+        # (label, image paths) once the user is saved; Save after a failed
+        # enrollment only retries the enrollment
+        saved_user = [None]
+        status_text = Text("")
+        progress_bar = ProgressBar(value=0, visible=False)
+
+        def show_status(message, progress=None):
+            status_text.value = message
+            if progress is not None:
+                progress_bar.visible = True
+                progress_bar.value = progress
+            try:
+                page.update(status_text, progress_bar)
+            except Exception as err:
+                # The dialog may have been closed in the meantime
+                print(f"Error in show_status: {err}")
 
         webcam_image = Image(expand=True)
-        threading.Thread(target=capture_frames, args=(webcam_image, 0), daemon=True).start()  # Registration camera
+        renderer.register(webcam_image, size=(300, 200))
+        # Enrollment shots are sampled from the preview stream itself
+        shot_collector = ShotCollector()
+        registration_camera = capture_frames(webcam_image, 0, sample=shot_collector.offer)  # Registration camera
+
+        def stop_registration_camera():
+            registration_camera.stop()
+            renderer.unregister(webcam_image)
+
+        def read_images():
+            try:
+                shots, sampled = capture_shots(
+                    shot_collector, progress=lambda done, total: show_status(f"Checking frame {done}/{total}", done / total))
+                captured_images[:] = [shot.frame for shot in shots]
+                print(f"Kept {len(shots)} of {sampled} sampled frames")
+                if not sampled:
+                    show_status("No frames from the registration camera")
+                elif not shots:
+                    show_status("No clear face found, move closer to the camera and try again", 0)
+                else:
+                    show_status(f"{len(shots)} good images captured (of {sampled} frames)", 1.0)
+            except Exception as err:
+                print(f"Error in read_images: {err}")
+                show_status("Capture failed")
+            finally:
+                capture_in_progress[0] = False
 
         def capture_images(e):
             if capture_in_progress[0]:
                 return
             capture_in_progress[0] = True
-
-            cap = cv2.VideoCapture(0)  # Registration camera
-            if not cap.isOpened():
-                print("Error: Could not open registration camera.")
-                capture_in_progress[0] = False
-                return
-
-            for i in range(3):
-                ret, frame = cap.read()
-                if ret:
-                    captured_images.append(frame)
-                    print(f"Captured image {i + 1}")
-                else:
-                    print(f"Error capturing image {i + 1}")
-            cap.release()
-
-            capture_in_progress[0] = False
-            page.update()
+            show_status("Capturing images, turn your head slightly left and right...")
+            # Sampling and scoring take seconds; keep them off the UI event handler
+            threading.Thread(target=read_images, daemon=True).start()
+
+        def enrollment_progress(job):
+            show_status(job.message, job.fraction() if job.state != 'done' else 1.0)
+            if job.state == 'done':
+                close_register_dialog()
+            elif job.state == 'failed':
+                save_button.disabled = False
+                page.update(save_button)
 
         def save_user(e):
             name = name_input.value
@@ -381,35 +447,60 @@ def main(page: Page):
 
             if not all([name, address, phone, email]):
                 print("Error: All fields must be filled.")
+                show_status("All fields must be filled")
+                return
+            if capture_in_progress[0]:
+                show_status("Wait for the capture to finish")
+                return
+            if not captured_images and saved_user[0] is None:
+                show_status("Capture images first")
+                return
+            save_button.disabled = True
+            page.update(save_button)
+            if saved_user[0] is not None:
+                submit_enrollment(*saved_user[0])
                 return
-
-            user_dir = os.path.join('images', name)
-            os.makedirs(user_dir, exist_ok=True)
-
-            for i, img in enumerate(captured_images):
-                image_path = os.path.join(user_dir, f"{name}_{i + 1}.jpg")
-                cv2.imwrite(image_path, img)
-                print(f"Image saved at {image_path}")
 
             conn = sqlite3.connect('app_database.db')
             cursor = conn.cursor()
             cursor.execute("INSERT INTO users (name, address, phone, email) VALUES (?, ?, ?, ?)",
                            (name, address, phone, email))
+            # The user's image folder, and so their label in the model
+            label = assign_label(conn, cursor.lastrowid, name)
             conn.commit()
             conn.close()
+            notify_users_changed()
 
             print("User data saved successfully")
 
-            train_model()
+            user_dir = os.path.join('images', label)
+            os.makedirs(user_dir, exist_ok=True)
 
-            register_dialog.open = False
-            page.update()
+            image_paths = []
+            for i, img in enumerate(captured_images):
+                image_path = os.path.join(user_dir, f"{label}_{i + 1}.jpg")
+                cv2.imwrite(image_path, img)
+                image_paths.append(image_path)
+                print(f"Image saved at {image_path}")
+
+            saved_user[0] = (label, image_paths)
+            stop_registration_camera()
+            submit_enrollment(label, image_paths)
+
+        def submit_enrollment(label, image_paths):
+            try:
+                enrollment_jobs.submit(label, image_paths, on_progress=enrollment_progress)
+            except EnrollmentConflict as err:
+                show_status(str(err))
+                save_button.disabled = False
+                page.update(save_button)
 
         save_button = ElevatedButton(text="Save", on_click=save_user)
         capture_button = ElevatedButton(text="Capture Images", on_click=capture_images)
         close_button = IconButton(icon=icons.CLOSE, on_click=lambda e: close_register_dialog())
 
         def close_register_dialog():
+            stop_registration_camera()
             register_dialog.open = False
             page.update()
 
@@ -423,7 +514,9 @@ def main(page: Page):
                 email_input,
                 Container(content=webcam_image, height=200, width=300),
                 capture_button,
-                save_button
+                save_button,
+                status_text,
+                progress_bar,
             ], scroll=ScrollMode.AUTO)
         )
 
@@ -443,9 +536,54 @@ def main(page: Page):
     webcam_image_1 = Image(expand=True)
     webcam_image_2 = Image(expand=True)
     
-    threading.Thread(target=capture_frames, args=(webcam_image_1, 1, True, 'entry'), daemon=True).start()  # Entry camera
-    threading.Thread(target=capture_frames, args=(webcam_image_2, 2, True, 'exit'), daemon=True).start()  # Exit camera
+    capture_frames(webcam_image_1, 1, True, 'entry')  # Entry camera
+    capture_frames(webcam_image_2, 2, True, 'exit')  # Exit camera
+
 
+    # Entry/exit feeds; cameras added from Add Camera are appended here
+    camera_row = Row(
+        expand=True,
+        alignment=MainAxisAlignment.CENTER,
+        controls=[
+            Column(
+                expand=True,
+                alignment=alignment.center,
+                controls=[
+                    Text("Entry Camera"),  # Label for Entry Camera
+                    Container(
+                        expand=True,
+                        alignment=alignment.center,
+                        content=webcam_image_1,
+                    ),
+                ],
+            ),
+            Column(
+                expand=True,
+                alignment=alignment.center,
+                controls=[
+                    Text("Exit Camera"),  # Label for Exit Camera
+                    Container(
+                        expand=True,
+                        alignment=alignment.center,
+                        content=webcam_image_2,
+                    ),
+                ],
+            ),
+        ],
+    )
+
+    def resize_camera_previews(e=None):
+        # The feeds share the camera row equally; encode each preview at the
+        # size it is shown at rather than render.preview_size
+        if not page.width or not page.height or not camera_row.controls:
+            return
+        width = max(1, int((page.width - camera_row_margin[0]) / len(camera_row.controls)))
+        height = max(1, int(page.height - camera_row_margin[1]))
+        for column in camera_row.controls:
+            renderer.resize(column.controls[1].content, (width, height))
+
+    resize_camera_previews()
+    page.on_resize = resize_camera_previews
 
     first_page_contents = Container(
         expand=True,
@@ -468,36 +606,7 @@ def main(page: Page):
                 ),
                 Container(height=20),
                 Text("All Cameras"),
-                Row(
-                    expand=True,
-                    alignment=MainAxisAlignment.CENTER,
-                    controls=[
-                        Column(
-                            expand=True,
-                            alignment=alignment.center,
-                            controls=[
-                                Text("Entry Camera"),  # Label for Entry Camera
-                                Container(
-                                    expand=True,
-                                    alignment=alignment.center,
-                                    content=webcam_image_1,
-                                ),
-                            ],
-                        ),
-                        Column(
-                            expand=True,
-                            alignment=alignment.center,
-                            controls=[
-                                Text("Exit Camera"),  # Label for Exit Camera
-                                Container(
-                                    expand=True,
-                                    alignment=alignment.center,
-                                    content=webcam_image_2,
-                                ),
-                            ],
-                        ),
-                    ],
-                ),
+                camera_row,
             ],
         ),
     )
@@ -615,4 +724,11 @@ def main(page: Page):
     page.on_route_change = route_change
     page.go(page.route)
 
-app(target=main, assets_dir='assets')
+if __name__ == '__main__':
+    # Training spawns worker processes, which re-import this module
+    multiprocessing.freeze_support()
+    migrate()
+    import_legacy_model()
+    if current_model_path(trained_model_file) is None:
+        train_model()
+    app(target=main, assets_dir='assets')
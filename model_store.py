@@ -0,0 +1,126 @@
+import glob
+import json
+import os
+import pickle
+import struct
+import time
+
+import numpy as np
+
+# File layout (little endian):
+#   64-byte header: magic, format version, dimensions, count,
+#                   encodings offset, labels offset, labels length
+#   float32 encoding matrix (count x dimensions) at the encodings offset
+#   UTF-8 JSON at the labels offset: {"labels": [...], "user_ids": {label: id}}
+#   (format 1: just the list of labels)
+model_magic = b'SLCVFACE'
+model_format_version = 2
+_header = struct.Struct('<8sIIQQQQ')
+_header_size = 64
+
+# Each write goes to a new numbered generation (trained_model.<n>.bin) instead
+# of replacing the file in place: Windows refuses to replace or delete a file
+# that a camera process still has memory-mapped.
+
+
+def _generation_pattern(model_file):
+    return os.path.splitext(model_file)[0] + '.*.bin'
+
+
+def model_generations(model_file):
+    generations = []
+    for path in glob.glob(_generation_pattern(model_file)):
+        number = path[:-len('.bin')].rsplit('.', 1)[-1]
+        if number.isdigit():
+            generations.append((int(number), path))
+    return [path for _, path in sorted(generations)]
+
+
+def current_model_path(model_file):
+    generations = model_generations(model_file)
+    return generations[-1] if generations else None
+
+
+def new_model_path(model_file):
+    generation = time.time_ns()
+    current = current_model_path(model_file)
+    if current is not None:
+        generation = max(generation, int(current[:-len('.bin')].rsplit('.', 1)[-1]) + 1)
+    return f"{os.path.splitext(model_file)[0]}.{generation}.bin"
+
+
+def write_model_file(path, faces_encodings, labels, user_ids=None):
+    encodings = np.ascontiguousarray(faces_encodings, dtype=np.float32).reshape(-1, 128)
+    labels = [str(label) for label in labels]
+    user_ids = {str(label): int(user_id) for label, user_id in (user_ids or {}).items() if user_id is not None}
+    label_bytes = json.dumps({'labels': labels, 'user_ids': user_ids}).encode('utf-8')
+    encodings_offset = _header_size
+    labels_offset = encodings_offset + encodings.nbytes
+    header = _header.pack(model_magic, model_format_version, encodings.shape[1], len(labels),
+                          encodings_offset, labels_offset, len(label_bytes))
+
+    temp_file = path + '.tmp'
+    with open(temp_file, 'wb') as file:
+        file.write(header.ljust(_header_size, b'\0'))
+        file.write(encodings.tobytes())
+        file.write(label_bytes)
+    os.replace(temp_file, path)
+
+
+def read_model_file(path, mmap=True):
+    """Return (encodings, labels, user_ids); encodings is a read-only memmap when mmap is set.
+
+    user_ids maps labels to users.id as linked when the model was written.
+    """
+    with open(path, 'rb') as file:
+        header = file.read(_header_size)
+        if len(header) < _header.size:
+            raise ValueError(f"{path}: truncated header")
+        magic, version, dimensions, count, encodings_offset, labels_offset, labels_length = _header.unpack_from(header)
+        if magic != model_magic:
+            raise ValueError(f"{path}: not a face model file")
+        if version not in (1, model_format_version):
+            raise ValueError(f"{path}: unsupported model format {version}")
+        file.seek(labels_offset)
+        table = json.loads(file.read(labels_length).decode('utf-8'))
+    if version == 1:
+        labels, user_ids = table, {}
+    else:
+        labels, user_ids = table['labels'], {label: int(user_id) for label, user_id in table['user_ids'].items()}
+    if len(labels) != count:
+        raise ValueError(f"{path}: label table has {len(labels)} entries, expected {count}")
+
+    if not count:
+        return np.empty((0, dimensions), dtype=np.float32), labels, user_ids
+    if mmap:
+        encodings = np.memmap(path, dtype=np.float32, mode='r', offset=encodings_offset, shape=(count, dimensions))
+    else:
+        encodings = np.fromfile(path, dtype=np.float32, count=count * dimensions, offset=encodings_offset)
+        encodings = encodings.reshape(count, dimensions)
+    return encodings, labels, user_ids
+
+
+def remove_old_generations(model_file, keep, companions=()):
+    # Generations still mapped by a running process cannot be deleted on
+    # Windows; they are left alone and retried on the next write
+    for path in model_generations(model_file):
+        if os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        for companion in [path] + [companion_for(path) for companion_for in companions]:
+            try:
+                if os.path.exists(companion):
+                    os.remove(companion)
+            except OSError:
+                pass
+
+
+def import_pickle_model(pickle_file, model_file):
+    """Convert a legacy pickled (encodings, labels) model, if no binary model exists yet."""
+    if current_model_path(model_file) is not None or not os.path.isfile(pickle_file):
+        return None
+    with open(pickle_file, 'rb') as file:
+        faces_encodings, labels = pickle.load(file)
+    path = new_model_path(model_file)
+    write_model_file(path, faces_encodings, labels)
+    print(f"Imported {len(labels)} encodings from {pickle_file} into {path}")
+    return path
@@ -0,0 +1,114 @@
+import cv2
+import face_recognition
+import numpy as np
+
+# Fraction of the frame size the HOG detector runs on (1.0 = full resolution).
+# HOG cost scales with pixel count, so 0.5 is roughly 4x cheaper; faces must
+# still be about 80 px wide after scaling to be found.
+detection_scale = 1.0
+# Encode from the full-resolution frame using the rescaled boxes; the encoder
+# cost does not depend on frame size, only on the number of faces
+encode_full_resolution = True
+
+
+def scale_box(box, factor, frame_shape):
+    top, right, bottom, left = box
+    height, width = frame_shape[:2]
+    return (max(0, int(round(top * factor))), min(width, int(round(right * factor))),
+            min(height, int(round(bottom * factor))), max(0, int(round(left * factor))))
+
+
+def detect_faces(rgb_frame, scale=None):
+    """Return face boxes (top, right, bottom, left) in full-frame coordinates."""
+    scale = detection_scale if scale is None else scale
+    if scale >= 1.0:
+        return face_recognition.face_locations(rgb_frame)
+    small_frame = cv2.resize(rgb_frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return [scale_box(box, 1.0 / scale, rgb_frame.shape) for box in face_recognition.face_locations(small_frame)]
+
+
+def encoding_inputs(rgb_frame, face_locations, scale=None, full_resolution=None):
+    """Return the (frame, boxes) the encoder should run on for full-frame boxes."""
+    scale = detection_scale if scale is None else scale
+    full_resolution = encode_full_resolution if full_resolution is None else full_resolution
+    if scale >= 1.0 or full_resolution:
+        return rgb_frame, list(face_locations)
+    small_frame = cv2.resize(rgb_frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return small_frame, [scale_box(box, scale, small_frame.shape) for box in face_locations]
+
+
+def encode_faces(rgb_frame, face_locations, scale=None, full_resolution=None):
+    """Encode the faces at full-frame boxes, from the detection-scale frame if configured."""
+    if not face_locations:
+        return []
+    frame, boxes = encoding_inputs(rgb_frame, face_locations, scale, full_resolution)
+    return face_recognition.face_encodings(frame, boxes)
+
+
+# Whether this dlib build has the batched compute_face_descriptor overload
+# (frames, detections); None until checked
+_batch_descriptors = None
+
+
+def supports_batch_descriptors():
+    global _batch_descriptors
+    if _batch_descriptors is None:
+        try:
+            import dlib
+            from face_recognition import api
+
+            # pybind11 lists every overload's arguments in the docstring
+            doc = api.face_encoder.compute_face_descriptor.__doc__ or ''
+            _batch_descriptors = ('batch_faces' in doc and hasattr(dlib, 'full_object_detections')
+                                  and hasattr(api, '_raw_face_landmarks'))
+        except (ImportError, AttributeError):
+            _batch_descriptors = False
+    return _batch_descriptors
+
+
+def encode_face_batch(items):
+    """Encode faces of several frames with one batched dlib call.
+
+    items is a list of (rgb_frame, face_locations) already prepared by
+    encoding_inputs(); returns one list of encodings per item. dlib builds
+    without the batch overload encode frame by frame instead.
+    """
+    global _batch_descriptors
+    results = [[] for _ in items]
+    with_faces = [i for i, (_, boxes) in enumerate(items) if boxes]
+    if not with_faces:
+        return results
+    if supports_batch_descriptors():
+        import dlib
+        from face_recognition import api
+
+        frames = []
+        detections = []
+        for i in with_faces:
+            frame, boxes = items[i]
+            landmarks = dlib.full_object_detections()
+            for landmark in api._raw_face_landmarks(frame, boxes, model='small'):
+                landmarks.append(landmark)
+            frames.append(frame)
+            detections.append(landmarks)
+        try:
+            descriptors = api.face_encoder.compute_face_descriptor(frames, detections, 1)
+        except TypeError:
+            # The docstring promised an overload this build does not accept;
+            # remember, so later batches skip the wasted landmark pass
+            print("dlib has no batched compute_face_descriptor, encoding frame by frame")
+            _batch_descriptors = False
+        else:
+            for i, frame_descriptors in zip(with_faces, descriptors):
+                results[i] = [np.array(descriptor) for descriptor in frame_descriptors]
+            return results
+    for i in with_faces:
+        frame, boxes = items[i]
+        results[i] = face_recognition.face_encodings(frame, boxes)
+    return results
+
+
+def locate_and_encode(rgb_frame, scale=None, full_resolution=None):
+    """Return (face boxes, encodings) for an RGB frame, detecting at the given scale."""
+    face_locations = detect_faces(rgb_frame, scale)
+    return face_locations, encode_faces(rgb_frame, face_locations, scale, full_resolution)
@@ -0,0 +1,246 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as ResultTimeout
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import recognition
+
+# Worker processes shared by all cameras (None = one per core, leaving one for the UI)
+recognition_workers = None
+# Encode requests from all cameras arriving within encode_batch_max_wait
+# seconds are encoded together, up to encode_batch_max_faces faces per call
+encode_batch_max_faces = 16
+encode_batch_max_wait = 0.01
+# Seconds a camera waits for a detect/encode result; a pool that takes
+# longer is taken to be hung and is restarted like a crashed one
+result_timeout = 30.0
+
+# Shared memory blocks a worker process has attached to, by name
+_attached = {}
+
+
+def _attach_frame(shm_name, shape):
+    shm = _attached.get(shm_name)
+    if shm is None:
+        # Pool workers share the app's resource tracker, so attaching here
+        # does not make the block outlive (or die with) this worker
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _attached[shm_name] = shm
+    return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+
+def _release_frame(shm_name):
+    shm = _attached.pop(shm_name, None)
+    if shm is not None:
+        shm.close()
+
+
+def _worker_detect(shm_name, shape, scale):
+    return recognition.detect_faces(_attach_frame(shm_name, shape), scale)
+
+
+def _worker_encode(shm_name, shape, face_locations, scale):
+    frame = _attach_frame(shm_name, shape)
+    return [np.asarray(encoding) for encoding in recognition.encode_faces(frame, face_locations, scale)]
+
+
+def _worker_encode_batch(requests):
+    items = []
+    for shm_name, shape, face_locations, scale in requests:
+        items.append(recognition.encoding_inputs(_attach_frame(shm_name, shape), face_locations, scale))
+    return [[np.asarray(encoding) for encoding in encodings] for encodings in recognition.encode_face_batch(items)]
+
+
+def _worker_forget(shm_name):
+    _release_frame(shm_name)
+
+
+class InProcessRecognizer:
+    """Same interface as RecognitionClient, running in the calling thread."""
+
+    def __init__(self):
+        self._frame = None
+
+    def detect(self, rgb_frame, scale=None):
+        self._frame = rgb_frame
+        return recognition.detect_faces(rgb_frame, scale)
+
+    def encode(self, face_locations, scale=None):
+        return recognition.encode_faces(self._frame, face_locations, scale)
+
+    def close(self):
+        self._frame = None
+
+
+class RecognitionClient:
+    """One camera's connection to the shared pool.
+
+    The frame is copied once into this camera's shared memory block; detect()
+    and the following encode() both read it there, so only boxes and
+    encodings are pickled. A camera waits for each result before sending its
+    next frame, so one block per camera is enough.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self._shm = None
+        self._shape = None
+
+    def _store(self, rgb_frame):
+        if self._shm is None or self._shm.size < rgb_frame.nbytes:
+            self.close()
+            self._shm = shared_memory.SharedMemory(create=True, size=rgb_frame.nbytes)
+        self._shape = rgb_frame.shape
+        np.ndarray(rgb_frame.shape, dtype=np.uint8, buffer=self._shm.buf)[...] = rgb_frame
+
+    def detect(self, rgb_frame, scale=None):
+        self._store(rgb_frame)
+        executor, future = self.service.submit(_worker_detect, self._shm.name, self._shape, scale)
+        return self.service.wait(executor, future)
+
+    def encode(self, face_locations, scale=None):
+        if not face_locations:
+            return []
+        if self.service.batcher is None:
+            executor, future = self.service.submit(
+                _worker_encode, self._shm.name, self._shape, list(face_locations), scale)
+        else:
+            executor = self.service.executor
+            future = self.service.batcher.submit(self._shm.name, self._shape, list(face_locations), scale)
+        return self.service.wait(executor, future)
+
+    def close(self):
+        if self._shm is not None:
+            name = self._shm.name
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            self.service.forget(name)
+
+
+class EncodeBatcher:
+    """Gathers encode requests from all cameras into batched pool jobs."""
+
+    def __init__(self, executor, max_faces=None, max_wait=None):
+        self.executor = executor
+        self.max_faces = max_faces or encode_batch_max_faces
+        self.max_wait = encode_batch_max_wait if max_wait is None else max_wait
+        self.batches = 0
+        self.faces = 0
+        self._requests = queue.Queue()
+        threading.Thread(target=self._run, name='encode-batcher', daemon=True).start()
+
+    def submit(self, shm_name, shape, face_locations, scale):
+        future = Future()
+        self._requests.put(((shm_name, shape, face_locations, scale), future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()]
+            faces = len(batch[0][0][2])
+            deadline = time.monotonic() + self.max_wait
+            while faces < self.max_faces:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                faces += len(request[0][2])
+            self.batches += 1
+            self.faces += faces
+            try:
+                job = self.executor.submit(_worker_encode_batch, [request for request, _ in batch])
+            except Exception as err:
+                for _, future in batch:
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(err)
+                continue
+            job.add_done_callback(lambda job, futures=[future for _, future in batch]: self._route(job, futures))
+
+    @staticmethod
+    def _route(job, futures):
+        # Hand each camera back the encodings of its own faces; a camera that
+        # timed out has cancelled its future and gets nothing
+        try:
+            results = job.result()
+        except Exception as err:
+            for future in futures:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(err)
+            return
+        for future, encodings in zip(futures, results):
+            if future.set_running_or_notify_cancel():
+                future.set_result(encodings)
+
+
+class RecognitionService:
+    """Process pool doing face detection and encoding for every camera.
+
+    A worker that crashes (dlib fault, out of memory) breaks the whole pool;
+    the first camera to notice replaces it, and the frames in flight are
+    skipped instead of every later frame failing.
+    """
+
+    def __init__(self, workers=None, batch_encoding=True):
+        workers = workers or recognition_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.batcher = EncodeBatcher(self.executor) if batch_encoding else None
+        self.restarts = 0
+        self._restart_lock = threading.Lock()
+
+    def client(self):
+        return RecognitionClient(self)
+
+    def submit(self, fn, *args):
+        """Submit to the pool, replacing it first if it is broken; returns (executor, future)."""
+        executor = self.executor
+        try:
+            return executor, executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self.restart(executor)
+            executor = self.executor
+            return executor, executor.submit(fn, *args)
+
+    def wait(self, executor, future):
+        try:
+            return future.result(timeout=result_timeout)
+        except BrokenProcessPool:
+            self.restart(executor)
+            raise
+        except ResultTimeout:
+            future.cancel()
+            self.restart(executor)
+            raise
+
+    def restart(self, broken):
+        with self._restart_lock:
+            if self.executor is not broken:
+                return  # another camera already replaced it
+            print("Recognition worker pool failed, starting a new one")
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            if self.batcher is not None:
+                self.batcher.executor = self.executor
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def forget(self, shm_name):
+        # Workers that attached to a released block drop their mapping lazily
+        for _ in range(self.workers):
+            try:
+                self.executor.submit(_worker_forget, shm_name)
+            except BrokenProcessPool:
+                return  # the replacement pool never attached to it
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
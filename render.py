@@ -0,0 +1,128 @@
+import base64
+import threading
+import time
+
+import cv2
+
+# Preview refresh rate, JPEG quality and size used when a preview does not set its own
+preview_fps = 12.0
+preview_jpeg_quality = 70
+preview_size = (640, 360)
+
+
+class PreviewTarget:
+    def __init__(self, control, size, fps, quality):
+        self.control = control
+        self.size = size
+        self.interval = 1.0 / fps
+        self.quality = quality
+        self.frame = None
+        self.next_render = 0.0
+        self.rendered = 0
+        self.skipped = 0
+
+
+class RenderScheduler:
+    """Pushes camera frames to Flet Image controls on a single UI tick.
+
+    Cameras call submit() as often as they like; only the newest frame of
+    each preview is kept. On each tick, previews that are due are resized to
+    their display size, JPEG-encoded and assigned, and all changed controls
+    are sent in one page.update(*controls) instead of a full page diff per
+    frame.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.ticks = 0
+        threading.Thread(target=self._run, name='render-scheduler', daemon=True).start()
+
+    def register(self, control, size=None, fps=None, quality=None):
+        target = PreviewTarget(control, size or preview_size, fps or preview_fps, quality or preview_jpeg_quality)
+        with self._lock:
+            self._targets[id(control)] = target
+        return target
+
+    def resize(self, control, size):
+        """Change the size a preview is encoded at, e.g. when its container was resized."""
+        with self._lock:
+            target = self._targets.get(id(control))
+            if target is None:
+                target = self._targets[id(control)] = PreviewTarget(control, size, preview_fps, preview_jpeg_quality)
+            target.size = size
+
+    def unregister(self, control):
+        with self._lock:
+            self._targets.pop(id(control), None)
+
+    def submit(self, control, frame):
+        with self._lock:
+            target = self._targets.get(id(control))
+            if target is None:
+                target = self._targets[id(control)] = PreviewTarget(
+                    control, preview_size, preview_fps, preview_jpeg_quality)
+            if target.frame is not None:
+                target.skipped += 1
+            target.frame = frame
+        self._wake.set()
+
+    def _encode(self, target, frame):
+        height, width = frame.shape[:2]
+        scale = min(target.size[0] / float(width), target.size[1] / float(height), 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(target.quality)])
+        return base64.b64encode(jpeg.tobytes()).decode('utf-8') if ok else None
+
+    def _update_one_by_one(self, controls):
+        # A preview whose dialog was closed is no longer on the page; drop it
+        # so it cannot break the update of the other previews
+        for control in controls:
+            try:
+                self.page.update(control)
+            except Exception as err:
+                print(f"Error in RenderScheduler update, removing preview: {err}")
+                self.unregister(control)
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=1.0)
+            self._wake.clear()
+            now = time.monotonic()
+            due = []
+            wait = None
+            with self._lock:
+                for target in self._targets.values():
+                    if target.frame is None:
+                        continue
+                    if now >= target.next_render:
+                        due.append((target, target.frame))
+                        target.frame = None
+                        target.next_render = now + target.interval
+                    else:
+                        remaining = target.next_render - now
+                        wait = remaining if wait is None else min(wait, remaining)
+
+            controls = []
+            for target, frame in due:
+                try:
+                    src = self._encode(target, frame)
+                except Exception as err:
+                    print(f"Error in RenderScheduler._encode: {err}")
+                    continue
+                if src is not None:
+                    target.control.src_base64 = src
+                    target.rendered += 1
+                    controls.append(target.control)
+            if controls:
+                try:
+                    self.page.update(*controls)
+                except Exception:
+                    self._update_one_by_one(controls)
+                self.ticks += 1
+            if wait is not None:
+                time.sleep(wait)
+                self._wake.set()
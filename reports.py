@@ -0,0 +1,73 @@
+import datetime
+
+from database import connect
+
+# Records stay open (no check-out) when someone leaves past another door; only
+# check-ins this recent count as open sessions
+open_session_max_age = datetime.timedelta(hours=24)
+
+# Every query below selects records by a check_in_time range first, so it
+# runs on idx_records_check_in and its cost follows the size of the range,
+# not of the whole table.
+
+_presence_sql = '''
+    SELECT r.user_id, u.name, MIN(r.check_in_time), MAX(r.check_out_time), COUNT(*),
+           ROUND(SUM(CASE WHEN r.check_out_time IS NOT NULL
+                          THEN (julianday(r.check_out_time) - julianday(r.check_in_time)) * 86400 END))
+    FROM records r JOIN users u ON u.id = r.user_id
+    WHERE r.check_in_time >= ? AND r.check_in_time < ? AND r.user_id IS NOT NULL
+    GROUP BY r.user_id
+    ORDER BY u.name
+'''
+
+_open_sessions_sql = '''
+    SELECT r.id, r.user_id, u.name, r.check_in_time
+    FROM records r JOIN users u ON u.id = r.user_id
+    WHERE r.check_in_time >= ? AND r.check_out_time IS NULL AND r.user_id IS NOT NULL
+    ORDER BY r.check_in_time
+'''
+
+
+def to_sqlite_time(moment):
+    """Format a datetime (naive = local time) the way records store times (UTC)."""
+    return moment.astimezone(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def day_range(day):
+    """UTC bounds of a local calendar day."""
+    start = datetime.datetime.combine(day, datetime.time.min)
+    return to_sqlite_time(start), to_sqlite_time(start + datetime.timedelta(days=1))
+
+
+def _query(sql, params, conn):
+    if conn is not None:
+        return conn.execute(sql, params).fetchall()
+    conn = connect()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def presence(start, end, conn=None):
+    """One row per user checked in between start and end (datetimes):
+    (user_id, name, first check-in, last check-out, visits, dwell seconds).
+    Dwell counts only closed sessions; times are UTC as stored.
+    """
+    return _query(_presence_sql, (to_sqlite_time(start), to_sqlite_time(end)), conn)
+
+
+def daily_presence(day=None, conn=None):
+    """presence() for one local calendar day (default today)."""
+    return _query(_presence_sql, day_range(day or datetime.date.today()), conn)
+
+
+def dwell_times(start, end, conn=None):
+    """{name: total seconds present} over closed sessions checked in between start and end."""
+    return {name: dwell or 0.0 for _, name, _, _, _, dwell in presence(start, end, conn)}
+
+
+def open_sessions(since=None, conn=None):
+    """(record_id, user_id, name, check-in time) of people checked in but not out yet."""
+    since = since or datetime.datetime.now() - open_session_max_age
+    return _query(_open_sessions_sql, (to_sqlite_time(since),), conn)
@@ -0,0 +1,85 @@
+import hashlib
+import os
+
+import cv2
+
+# Event snapshots live here as JPEG files named by the SHA-1 of their bytes
+# (snapshots/ab/abcdef....jpg); records keep only the relative path
+snapshot_folder = 'snapshots'
+# Face crops: the box grown by crop_margin on each side, then at most
+# crop_max_side pixels on the long side
+crop_margin = 0.3
+crop_max_side = 256
+# Optional downscaled view of the whole frame for context (None = not stored)
+context_max_side = 320
+snapshot_jpeg_quality = 85
+# Records moved per transaction by move_record_images()
+migration_batch_size = 200
+
+
+def downscale(image, max_side):
+    height, width = image.shape[:2]
+    scale = max_side / float(max(height, width))
+    if scale >= 1.0:
+        return image
+    return cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+def crop_face(frame, box, margin=None, max_side=None):
+    margin = crop_margin if margin is None else margin
+    top, right, bottom, left = box
+    grow_y = int((bottom - top) * margin)
+    grow_x = int((right - left) * margin)
+    height, width = frame.shape[:2]
+    crop = frame[max(0, top - grow_y):min(height, bottom + grow_y), max(0, left - grow_x):min(width, right + grow_x)]
+    return downscale(crop, max_side or crop_max_side)
+
+
+def store_bytes(data, folder=None, extension='.jpg'):
+    """Write data under its content hash (once) and return the path relative to the store."""
+    digest = hashlib.sha1(data).hexdigest()
+    relative = os.path.join(digest[:2], digest + extension)
+    path = os.path.join(folder or snapshot_folder, relative)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return relative.replace(os.sep, '/')
+
+
+def store_image(image, folder=None, quality=None):
+    ok, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, int(quality or snapshot_jpeg_quality)])
+    return store_bytes(jpeg.tobytes(), folder) if ok else None
+
+
+def store_event_snapshot(frame, box, folder=None):
+    """Store the face crop (and context thumbnail) of an event; returns (snapshot, thumbnail) paths."""
+    snapshot = store_image(crop_face(frame, box), folder) if box is not None else None
+    thumbnail = store_image(downscale(frame, context_max_side), folder) if context_max_side else None
+    return snapshot, thumbnail
+
+
+def snapshot_path(relative, folder=None):
+    return os.path.join(folder or snapshot_folder, relative) if relative else None
+
+
+def move_record_images(conn, folder=None):
+    """Move image BLOBs left in records into the snapshot store; returns how many.
+
+    Old images are full frames; they are stored unchanged as the record's
+    thumbnail. Safe to re-run after an interruption.
+    """
+    moved = 0
+    while True:
+        rows = conn.execute('SELECT id, image FROM records WHERE image IS NOT NULL LIMIT ?',
+                            (migration_batch_size,)).fetchall()
+        if not rows:
+            return moved
+        with conn:
+            for record_id, image in rows:
+                conn.execute('UPDATE records SET thumbnail=COALESCE(thumbnail, ?), image=NULL WHERE id=?',
+                             (store_bytes(bytes(image), folder), record_id))
+        moved += len(rows)
+        print(f"Moved {moved} record images to {folder or snapshot_folder}")
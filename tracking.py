@@ -0,0 +1,179 @@
+import itertools
+import time
+
+import cv2
+import numpy as np
+
+# Full detection + recognition runs every N frames, or earlier when the scene
+# changes; in between, boxes are moved with sparse optical flow
+detect_every_n_frames = 5
+# Mean absolute grey-level difference (0-255) of a thumbnail that forces detection
+scene_change_threshold = 12.0
+# Minimum IoU for a detection to continue an existing track
+track_iou_threshold = 0.3
+# Width of the greyscale frame optical flow runs on
+flow_width = 320
+min_flow_points = 4
+# A track matched at or below this distance keeps its identity without
+# re-encoding until reverify_interval seconds pass, the track is lost or the
+# gallery changes
+identity_confident_distance = 0.45
+reverify_interval = 2.0
+
+_track_ids = itertools.count(1)
+
+
+def box_iou(a, b):
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    if not inter:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    def __init__(self, box, name, distance):
+        self.id = next(_track_ids)
+        self.box = box
+        self.name = name
+        self.distance = distance
+        self.age = 0
+        self.verified_at = None
+        self.gallery_version = None
+
+
+class FaceTracker:
+    """Per-camera tracker that decides when to run the detector.
+
+    Call begin_frame() for every frame; when it returns True, run detection,
+    pass the boxes to associate(), encode only the tracks needs_encoding()
+    returns and hand their matches to set_identities(). tracks always holds
+    the current boxes with the identity carried over from the last match.
+    """
+
+    def __init__(self, detect_every=None):
+        self.detect_every = detect_every or detect_every_n_frames
+        self.tracks = []
+        self.frames_since_detection = None
+        self.detections = 0
+        self.frames = 0
+        self._prev_gray = None
+        self._scale = 1.0
+        self._thumbnail = None
+        self._detection_thumbnail = None
+        self._frame_shape = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def begin_frame(self, frame):
+        self.frames += 1
+        self._frame_shape = frame.shape
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self._scale = min(1.0, flow_width / float(gray.shape[1]))
+        if self._scale < 1.0:
+            gray = cv2.resize(gray, (0, 0), fx=self._scale, fy=self._scale, interpolation=cv2.INTER_AREA)
+
+        if self._prev_gray is not None and self.tracks:
+            self._propagate(self._prev_gray, gray)
+        self._prev_gray = gray
+        self._thumbnail = cv2.resize(gray, (32, 24), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+        if self.frames_since_detection is None or self.frames_since_detection + 1 >= self.detect_every:
+            return True
+        if self._detection_thumbnail is not None:
+            change = float(np.mean(np.abs(self._thumbnail - self._detection_thumbnail)))
+            if change >= scene_change_threshold:
+                return True
+        self.frames_since_detection += 1
+        return False
+
+    def associate(self, face_locations):
+        """Continue tracks with fresh detections; returns one track per box."""
+        self.detections += 1
+        self.frames_since_detection = 0
+        self._detection_thumbnail = self._thumbnail
+
+        pairs = sorted(((box_iou(track.box, box), t, d)
+                        for t, track in enumerate(self.tracks)
+                        for d, box in enumerate(face_locations)), reverse=True)
+        used_tracks = set()
+        assigned = {}
+        for iou, t, d in pairs:
+            if iou < track_iou_threshold:
+                break
+            if t in used_tracks or d in assigned:
+                continue
+            used_tracks.add(t)
+            assigned[d] = self.tracks[t]
+
+        tracks = []
+        for d, box in enumerate(face_locations):
+            track = assigned.get(d)
+            if track is None:
+                track = Track(box, None, float('inf'))
+            else:
+                track.box = box
+                track.age += 1
+            tracks.append(track)
+        self.tracks = tracks
+        return tracks
+
+    def needs_encoding(self, tracks, gallery_version, now=None):
+        now = time.monotonic() if now is None else now
+        pending = []
+        for track in tracks:
+            if (track.verified_at is not None and track.name is not None
+                    and track.distance <= identity_confident_distance
+                    and track.gallery_version == gallery_version
+                    and now - track.verified_at < reverify_interval):
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+                pending.append(track)
+        return pending
+
+    def set_identities(self, tracks, matches, gallery_version, now=None):
+        now = time.monotonic() if now is None else now
+        for track, (name, distance) in zip(tracks, matches):
+            track.name = name
+            track.distance = distance
+            track.verified_at = now
+            track.gallery_version = gallery_version
+
+    def stats(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'frames': self.frames,
+            'detections': self.detections,
+            'tracks': len(self.tracks),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0,
+        }
+
+    def _propagate(self, prev_gray, gray):
+        height, width = self._frame_shape[:2]
+        tracks = []
+        for track in self.tracks:
+            top, right, bottom, left = (int(v * self._scale) for v in track.box)
+            mask = np.zeros_like(prev_gray)
+            mask[max(0, top):max(0, bottom), max(0, left):max(0, right)] = 255
+            points = cv2.goodFeaturesToTrack(prev_gray, maxCorners=30, qualityLevel=0.01, minDistance=3, mask=mask)
+            if points is None or len(points) < min_flow_points:
+                tracks.append(track)
+                continue
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, winSize=(15, 15), maxLevel=2)
+            good = status.reshape(-1) == 1
+            if good.sum() < min_flow_points:
+                # Lost the face between detections: drop it until the next detection
+                continue
+            dx, dy = np.median((moved - points).reshape(-1, 2)[good], axis=0) / self._scale
+            top, right, bottom, left = track.box
+            track.box = (int(round(np.clip(top + dy, 0, height))), int(round(np.clip(right + dx, 0, width))),
+                         int(round(np.clip(bottom + dy, 0, height))), int(round(np.clip(left + dx, 0, width))))
+            track.age += 1
+            tracks.append(track)
+        self.tracks = tracks
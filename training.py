@@ -0,0 +1,273 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import face_recognition
+import numpy as np
+
+from ann_index import build_index_file, index_file_for
+from encoding_cache import EncodingCache
+from gallery import notify_model_changed
+from identities import link_labels
+from image_io import image_extensions, read_image
+from model_store import import_pickle_model, new_model_path, remove_old_generations, write_model_file
+
+# Written as numbered generations trained_model.<n>.bin, see model_store
+trained_model_file = 'trained_model.bin'
+# Pickled model of earlier versions, imported once on startup
+legacy_model_file = 'trained_model.pkl'
+# image path -> (content hash, label, mtime, size) of the images the model was
+# built from; the encodings themselves live in the encoding cache
+manifest_file = 'trained_model_manifest.pkl'
+data_folder = 'images'
+# 'per_image' keeps every encoding, 'centroid' keeps one mean per person,
+# 'templates' keeps the mean plus a few encodings far away from it
+model_mode = 'per_image'
+max_templates_per_person = 3
+template_outlier_distance = 0.3
+# Worker processes used to encode images (None = one per CPU core); small
+# batches are encoded in-process because starting the pool costs more
+training_workers = None
+parallel_min_images = 16
+progress_interval = 2.0
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def encode_image(image):
+    # (face box, encoding) of the first face found, or None
+    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    face_locations = face_recognition.face_locations(rgb_image)
+    if face_locations:
+        encodings = face_recognition.face_encodings(rgb_image, face_locations[:1])
+        if encodings:
+            return face_locations[0], encodings[0]
+    return None
+
+def encode_image_file(img_path):
+    img = read_image(img_path)
+    if img is None:
+        return None
+    return encode_image(img)
+
+def training_image_paths(data_folder):
+    # Sorted so the model comes out in the same order on every machine
+    for person_name in sorted(os.listdir(data_folder)):
+        person_folder = os.path.join(data_folder, person_name)
+        if os.path.isdir(person_folder):
+            for filename in sorted(os.listdir(person_folder)):
+                img_path = os.path.join(person_folder, filename)
+                if filename.lower().endswith(image_extensions) and os.path.isfile(img_path):
+                    yield person_name, os.path.normpath(img_path)
+
+def load_manifest():
+    try:
+        with open(manifest_file, 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        return {}
+    except Exception as err:
+        print(f"Error in load_manifest: {err}")
+        return {}
+
+def save_manifest(manifest):
+    temp_file = manifest_file + '.tmp'
+    with open(temp_file, 'wb') as file:
+        pickle.dump(manifest, file)
+    os.replace(temp_file, manifest_file)
+
+def print_progress(done, total, images_per_second):
+    print(f"Encoded {done}/{total} images ({images_per_second:.1f} images/sec)")
+
+def encode_image_files(img_paths, progress=print_progress):
+    """Yield encode_image_file() of each image, in the order given.
+
+    Large batches are spread over a process pool; each worker reads and
+    decodes its own file, so only paths and 128-d results cross processes.
+    """
+    total = len(img_paths)
+    if not total:
+        return
+    workers = training_workers or os.cpu_count() or 1
+    start = last_report = time.monotonic()
+    if workers > 1 and total >= parallel_min_images:
+        chunksize = max(1, min(16, total // (workers * 4)))
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(encode_image_file, img_paths, chunksize=chunksize)
+    else:
+        executor = None
+        results = map(encode_image_file, img_paths)
+    try:
+        for done, result in enumerate(results, 1):
+            now = time.monotonic()
+            if progress and (now - last_report >= progress_interval or done == total):
+                last_report = now
+                progress(done, total, done / max(now - start, 1e-6))
+            yield result
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+def manifest_entry(img_path, person_name, previous=None):
+    # The content hash is only recomputed when the file's mtime or size moved
+    stat = os.stat(img_path)
+    if previous is not None and len(previous) == 4 and previous[1:] == (person_name, stat.st_mtime_ns, stat.st_size):
+        return previous
+    return (file_hash(img_path), person_name, stat.st_mtime_ns, stat.st_size)
+
+def encode_missing(cache, entries, progress=print_progress, batch_size=64):
+    # entries: {image path: manifest entry}; encodes each hash the cache lacks once
+    cached = cache.get_many({entry[0] for entry in entries.values()})
+    missing = {}
+    for img_path, entry in entries.items():
+        if entry[0] not in cached:
+            missing.setdefault(entry[0], img_path)
+
+    batch = []
+    for digest, result in zip(missing, encode_image_files(list(missing.values()), progress)):
+        batch.append((digest, result))
+        if len(batch) >= batch_size:
+            cache.put_many(batch)
+            batch = []
+    if batch:
+        cache.put_many(batch)
+    return len(missing)
+
+def update_manifest(data_folder, manifest, cache, progress=print_progress):
+    # Only images whose content is not in the cache get encoded. Nothing is
+    # evicted here: the cache is shared, and data_folder may be any folder
+    updated = {}
+    for person_name, img_path in training_image_paths(data_folder):
+        updated[img_path] = manifest_entry(img_path, person_name, manifest.get(img_path))
+    encoded = encode_missing(cache, updated, progress)
+    print(f"Training data: {len(updated)} images, {encoded} encoded, {len(updated) - encoded} reused.")
+    return updated
+
+def evict_unused(manifest, cache):
+    # Drop cache rows of images that are no longer in the model's manifest
+    evicted = cache.evict_except(entry[0] for entry in manifest.values())
+    if evicted:
+        print(f"{evicted} encodings evicted from cache.")
+    return evicted
+
+def manifest_training_data(manifest, cache):
+    labels = []
+    faces_encodings = []
+    cached = cache.get_many({entry[0] for entry in manifest.values()})
+    for entry in manifest.values():
+        result = cached.get(entry[0])
+        if result is not None:
+            faces_encodings.append(result[1])
+            labels.append(entry[1])
+    return faces_encodings, labels
+
+def prepare_training_data(data_folder):
+    cache = EncodingCache()
+    try:
+        return manifest_training_data(update_manifest(data_folder, {}, cache), cache)
+    finally:
+        cache.close()
+
+def person_templates(encodings, mode, max_templates=max_templates_per_person):
+    encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, 128)
+    templates = [encodings.mean(axis=0)]
+    if mode == 'centroid':
+        return templates
+    # Farthest-point selection: keep adding the encoding worst covered by the
+    # current templates while it is still an outlier
+    nearest = np.linalg.norm(encodings - templates[0], axis=1)
+    while len(templates) <= max_templates:
+        candidate = int(np.argmax(nearest))
+        if nearest[candidate] <= template_outlier_distance:
+            break
+        templates.append(encodings[candidate])
+        nearest = np.minimum(nearest, np.linalg.norm(encodings - encodings[candidate], axis=1))
+    return templates
+
+def aggregate_encodings(faces_encodings, labels, mode=model_mode):
+    if mode == 'per_image':
+        return list(faces_encodings), list(labels)
+    if mode not in ('centroid', 'templates'):
+        raise ValueError(f"Unknown model mode: {mode}")
+
+    by_person = {}
+    for encoding, label in zip(faces_encodings, labels):
+        by_person.setdefault(label, []).append(encoding)
+
+    aggregated_encodings = []
+    aggregated_labels = []
+    for label, encodings in by_person.items():
+        for template in person_templates(encodings, mode):
+            aggregated_encodings.append(template)
+            aggregated_labels.append(label)
+    return aggregated_encodings, aggregated_labels
+
+def write_model(faces_encodings, labels):
+    path = new_model_path(trained_model_file)
+    # The model carries the users.id of every label, so events need no name lookups
+    try:
+        user_ids = link_labels(labels)
+    except Exception as err:
+        print(f"Error in link_labels: {err}")
+        user_ids = {}
+    # The index is written first: the gallery only reloads when a new model generation appears
+    build_index_file(faces_encodings, index_file_for(path))
+    write_model_file(path, faces_encodings, labels, user_ids)
+    notify_model_changed(trained_model_file)
+    remove_old_generations(trained_model_file, keep=path, companions=(index_file_for,))
+
+def import_legacy_model():
+    try:
+        return import_pickle_model(legacy_model_file, trained_model_file)
+    except Exception as err:
+        print(f"Error in import_legacy_model: {err}")
+        return None
+
+_training_lock = threading.Lock()
+
+def build_model_from_manifest(manifest, cache, mode=None):
+    faces_encodings, labels = manifest_training_data(manifest, cache)
+    faces_encodings, labels = aggregate_encodings(faces_encodings, labels, mode or model_mode)
+    write_model(faces_encodings, labels)
+    print(f"Model trained and saved ({len(labels)} encodings, {mode or model_mode} mode).")
+
+def train_model(mode=None, progress=print_progress):
+    with _training_lock:
+        cache = EncodingCache()
+        try:
+            manifest = update_manifest(data_folder, load_manifest(), cache, progress)
+            save_manifest(manifest)
+            build_model_from_manifest(manifest, cache, mode)
+            evict_unused(manifest, cache)
+        finally:
+            cache.close()
+
+def enroll_images(person_name, image_paths, progress=print_progress):
+    """Add the given images of one person to the model, encoding only what the cache lacks."""
+    with _training_lock:
+        cache = EncodingCache()
+        try:
+            manifest = load_manifest()
+            if not manifest:
+                # No manifest yet (model from an older version): fall back to a full build once
+                manifest = update_manifest(data_folder, {}, cache, progress)
+            else:
+                for img_path in image_paths:
+                    img_path = os.path.normpath(img_path)
+                    manifest[img_path] = manifest_entry(img_path, person_name)
+                # Whole manifest, not just the new images: the cache may have been
+                # cleared (encoder upgrade, file deleted) since the last build, and
+                # intact hashes cost nothing here
+                encode_missing(cache, manifest, progress)
+            save_manifest(manifest)
+            build_model_from_manifest(manifest, cache)
+        finally:
+            cache.close()